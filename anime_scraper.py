@@ -1,10 +1,11 @@
 import requests
 from bs4 import BeautifulSoup
-import pandas as pd
 import os
 import time
 import random
 import re
+from catalog_store import DEFAULT_DB_PATH, open_catalog
+from dedupe import resolve_duplicates
 
 class AnimePlanetScraper:
     def __init__(self):
@@ -28,6 +29,7 @@ class AnimePlanetScraper:
         if not os.path.exists(self.posters_dir):
             os.makedirs(self.posters_dir)
         self.csv_path = "movies_data.csv"
+        self.db_path = DEFAULT_DB_PATH
 
     def download_image(self, url, filename):
         if not url or url == "None":
@@ -140,22 +142,14 @@ class AnimePlanetScraper:
             time.sleep(random.uniform(1.0, 2.0))
 
         if new_data:
-            # Load existing
-            if os.path.exists(self.csv_path):
-                df = pd.read_csv(self.csv_path)
-                # Remove old anime if user says they are empty/broken
-                # Actually user said "anime movies and poster are empty", maybe I should just append
-                # But let's avoid duplicates
-                existing_names = set(df['Name'].tolist())
+            with open_catalog(self.db_path, self.csv_path) as store:
+                # Avoid duplicates
+                existing_names = store.names()
                 final_new = [d for d in new_data if d['Name'] not in existing_names]
-                
-                df_new = pd.DataFrame(final_new)
-                df_combined = pd.concat([df, df_new], ignore_index=True)
-                df_combined.to_csv(self.csv_path, index=False)
-                print(f"Saved {len(final_new)} new anime titles to {self.csv_path}")
-            else:
-                pd.DataFrame(new_data).to_csv(self.csv_path, index=False)
-                print(f"Created {self.csv_path} with {len(new_data)} anime titles")
+                written, _ = store.upsert_many(final_new)
+                print(f"Saved {written} new anime titles to {self.db_path}")
+                # Anime-Planet names often differ from other sources' spellings of the same title
+                resolve_duplicates(store)
 
 if __name__ == "__main__":
     scraper = AnimePlanetScraper()
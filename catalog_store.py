@@ -0,0 +1,367 @@
+import csv
+import os
+import sqlite3
+import sys
+import time
+
+DEFAULT_DB_PATH = "watchify.db"
+DEFAULT_CSV_PATH = "movies_data.csv"
+
+# Catalog columns, in CSV order. Every title also has an integer ID primary key.
+COLUMNS = ['Name', 'Year', 'Rating', 'Genres', 'Actors', 'Plot', 'Poster_Path', 'Category', 'Source_URL']
+
+# Columns that feed the recommender's tags; changing one of them requires a model
+# rebuild, while other updates (e.g. a new poster) can be patched in place.
+CONTENT_COLUMNS = ['Name', 'Genres', 'Actors', 'Plot', 'Category']
+
+# Placeholder values the scrapers historically wrote instead of leaving a field empty
+NULL_SENTINELS = {'', 'None', 'nan', 'NaN', 'Unknown'}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS titles (
+    ID INTEGER PRIMARY KEY,
+    Name TEXT NOT NULL,
+    Year INTEGER,
+    Rating TEXT,
+    Genres TEXT,
+    Actors TEXT,
+    Plot TEXT,
+    Poster_Path TEXT,
+    Category TEXT,
+    Source_URL TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS titles_source_url ON titles (Source_URL);
+-- NULLs are distinct in a unique index, so a missing Year is keyed as -1
+CREATE UNIQUE INDEX IF NOT EXISTS titles_name_year ON titles (Name, coalesce(Year, -1));
+CREATE INDEX IF NOT EXISTS titles_category ON titles (Category);
+
+-- Source URLs of titles merged into another one by the dedupe stage
+CREATE TABLE IF NOT EXISTS title_aliases (
+    Source_URL TEXT PRIMARY KEY,
+    title_id INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    title_id INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    changed_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+);
+
+CREATE TRIGGER IF NOT EXISTS titles_insert AFTER INSERT ON titles BEGIN
+    INSERT INTO changes (title_id, op) VALUES (NEW.ID, 'insert');
+END;
+CREATE TRIGGER IF NOT EXISTS titles_delete AFTER DELETE ON titles BEGIN
+    INSERT INTO changes (title_id, op) VALUES (OLD.ID, 'delete');
+END;
+CREATE TRIGGER IF NOT EXISTS titles_update AFTER UPDATE ON titles
+WHEN {' OR '.join(f'OLD.{c} IS NOT NEW.{c}' for c in COLUMNS)}
+BEGIN
+    INSERT INTO changes (title_id, op) VALUES (
+        NEW.ID,
+        CASE WHEN {' OR '.join(f'OLD.{c} IS NOT NEW.{c}' for c in CONTENT_COLUMNS)}
+             THEN 'update' ELSE 'update_meta' END
+    );
+END;
+"""
+
+
+def clean_value(column, value):
+    """Normalizes a raw scraped/CSV value: sentinels become NULL and Year becomes an int."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:  # NaN from pandas
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if value in NULL_SENTINELS:
+            return None
+    if column == 'Year':
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+    return value
+
+
+class CatalogStore:
+    """
+    Watchify Catalog Store
+    Transactional SQLite storage for the title catalog, shared by the scrapers,
+    the maintenance scripts and the API.
+
+    - WAL journal mode: readers (the API) never block on writers (scrapers).
+    - Unique indexes on Source_URL and (Name, Year) make writes idempotent upserts
+      (a missing Year counts as one value, so yearless titles are keyed by Name).
+    - Every insert/update/delete is appended to the `changes` table by triggers,
+      so the recommender can tail it and reload incrementally.
+    """
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    # --- Writes ---------------------------------------------------------------
+
+    def upsert_many(self, records, batch_size=500):
+        """
+        Inserts or updates titles in batches, one transaction per batch.
+        A record updates the existing title with the same ID (if it has one),
+        Source_URL, or (Name, Year); only the columns present in the record are
+        written. A (Name, Year) match from a different source only fills empty
+        columns, and its Source_URL is kept as an alias of the existing title. Returns (written, conflicts), where conflicts are records that
+        would have merged two different existing titles and were skipped.
+        Records whose Source_URL was merged away by the dedupe stage are ignored.
+        """
+        written = conflicts = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                w, c = self._upsert_batch(batch)
+                written, conflicts, batch = written + w, conflicts + c, []
+        if batch:
+            w, c = self._upsert_batch(batch)
+            written, conflicts = written + w, conflicts + c
+        return written, conflicts
+
+    def _upsert_batch(self, batch):
+        written = conflicts = 0
+        with self._transaction():
+            for record in batch:
+                values = {c: clean_value(c, record[c]) for c in COLUMNS if c in record}
+                if record.get('ID') is None and self._is_alias(values.get('Source_URL')):
+                    continue
+                try:
+                    if record.get('ID') is not None:
+                        self._update(int(record['ID']), values)
+                    else:
+                        self._upsert(values)
+                    written += 1
+                except sqlite3.IntegrityError as e:
+                    print(f"Skipping conflicting record {record.get('Name')!r}: {e}")
+                    conflicts += 1
+        return written, conflicts
+
+    def _upsert(self, values):
+        source_url = values.get('Source_URL')
+        if source_url is not None and not self._has_source_url(source_url):
+            existing = self.conn.execute(
+                "SELECT ID, Source_URL FROM titles WHERE Name = ? AND coalesce(Year, -1) = coalesce(?, -1)",
+                (values.get('Name'), values.get('Year')),
+            ).fetchone()
+            if existing is not None and existing['Source_URL'] is not None:
+                self._add_source(existing['ID'], source_url, values)
+                return
+        columns = list(values)
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns)
+        sql = f"INSERT INTO titles ({', '.join(columns)}) VALUES ({placeholders})"
+        if values.get('Source_URL') is not None:
+            sql += f" ON CONFLICT (Source_URL) DO UPDATE SET {updates}"
+        sql += f" ON CONFLICT (Name, coalesce(Year, -1)) DO UPDATE SET {updates}"
+        self.conn.execute(sql, list(values.values()))
+
+    def _add_source(self, title_id, source_url, values):
+        """
+        Another source's record of an existing title: its URL becomes an alias
+        (so it counts as seen) and it only fills in the columns still missing,
+        instead of overwriting the row and flipping it back on the next scrape.
+        """
+        self.conn.execute("INSERT OR IGNORE INTO title_aliases (Source_URL, title_id) VALUES (?, ?)",
+                          (source_url, title_id))
+        fill = {c: v for c, v in values.items() if c not in ('Name', 'Year', 'Source_URL') and v is not None}
+        if fill:
+            assignments = ", ".join(f"{c} = coalesce({c}, ?)" for c in fill)
+            self.conn.execute(f"UPDATE titles SET {assignments} WHERE ID = ?", [*fill.values(), title_id])
+
+    def _has_source_url(self, source_url):
+        return self.conn.execute("SELECT 1 FROM titles WHERE Source_URL = ?", (source_url,)).fetchone() is not None
+
+    def _is_alias(self, source_url):
+        if source_url is None:
+            return False
+        return self.conn.execute("SELECT 1 FROM title_aliases WHERE Source_URL = ?", (source_url,)).fetchone() is not None
+
+    def _update(self, title_id, values):
+        if values:
+            assignments = ", ".join(f"{c} = ?" for c in values)
+            self.conn.execute(f"UPDATE titles SET {assignments} WHERE ID = ?", [*values.values(), title_id])
+
+    def update(self, title_id, **values):
+        """Updates some columns of one title, e.g. update(42, Poster_Path='posters/x.jpg')."""
+        self.upsert_many([{'ID': title_id, **values}])
+
+    def delete(self, title_ids):
+        """Deletes titles by ID in a single transaction; returns the number deleted."""
+        title_ids = [int(i) for i in title_ids]
+        with self._transaction():
+            self.conn.executemany("DELETE FROM titles WHERE ID = ?", [(i,) for i in title_ids])
+        return len(title_ids)
+
+    def merge(self, canonical, duplicate_ids):
+        """
+        Merges duplicate titles into a canonical one in a single transaction:
+        the canonical record is updated, the duplicates' Source_URLs are kept as
+        aliases of it, and the duplicates are deleted.
+        """
+        canonical_id = int(canonical['ID'])
+        duplicate_ids = [int(i) for i in duplicate_ids]
+        values = {c: clean_value(c, canonical[c]) for c in COLUMNS if c in canonical}
+        with self._transaction():
+            aliases = [
+                (row[0], canonical_id) for row in self.conn.execute(
+                    f"SELECT Source_URL FROM titles WHERE Source_URL IS NOT NULL "
+                    f"AND ID IN ({', '.join('?' for _ in duplicate_ids)})", duplicate_ids
+                )
+            ]
+            self.conn.executemany("UPDATE title_aliases SET title_id = ? WHERE title_id = ?",
+                                  [(canonical_id, i) for i in duplicate_ids])
+            self.conn.executemany("DELETE FROM titles WHERE ID = ?", [(i,) for i in duplicate_ids])
+            self.conn.executemany("INSERT OR REPLACE INTO title_aliases (Source_URL, title_id) VALUES (?, ?)", aliases)
+            # Written after the deletes, which free up the duplicates' unique keys
+            if values.get('Source_URL') in {url for url, _ in aliases}:
+                del values['Source_URL']
+            self._update(canonical_id, values)
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    # --- Reads ----------------------------------------------------------------
+
+    def records(self, category=None):
+        """Yields titles as dicts (ID plus COLUMNS) in ID order, optionally for one category."""
+        sql = f"SELECT ID, {', '.join(COLUMNS)} FROM titles"
+        params = []
+        if category:
+            sql += " WHERE lower(Category) = lower(?)"
+            params.append(category)
+        for row in self.conn.execute(sql + " ORDER BY ID", params):
+            yield dict(row)
+
+    def get(self, title_ids):
+        """Returns {ID: record} for the given IDs (missing IDs are absent)."""
+        title_ids = [int(i) for i in title_ids]
+        found = {}
+        for start in range(0, len(title_ids), 500):
+            chunk = title_ids[start:start + 500]
+            sql = f"SELECT ID, {', '.join(COLUMNS)} FROM titles WHERE ID IN ({', '.join('?' for _ in chunk)})"
+            for row in self.conn.execute(sql, chunk):
+                found[row['ID']] = dict(row)
+        return found
+
+    def count(self, category=None):
+        if category:
+            sql, params = "SELECT count(*) FROM titles WHERE lower(Category) = lower(?)", [category]
+        else:
+            sql, params = "SELECT count(*) FROM titles", []
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def source_urls(self):
+        """Source URLs already in the catalog, including those merged into another title."""
+        urls = {row[0] for row in self.conn.execute("SELECT Source_URL FROM titles WHERE Source_URL IS NOT NULL")}
+        return urls | {row[0] for row in self.conn.execute("SELECT Source_URL FROM title_aliases")}
+
+    def names(self):
+        return {row[0] for row in self.conn.execute("SELECT Name FROM titles")}
+
+    def load_frame(self):
+        """Returns the whole catalog as a pandas DataFrame (ID first), in ID order."""
+        import pandas as pd
+        return pd.read_sql_query(f"SELECT ID, {', '.join(COLUMNS)} FROM titles ORDER BY ID", self.conn)
+
+    def load_snapshot(self):
+        """
+        Returns (catalog DataFrame, last change seq) read in one transaction, so
+        the frame is exactly the catalog as of that change.
+        """
+        self.conn.execute("BEGIN")
+        try:
+            seq = self.last_change()
+            return self.load_frame(), seq
+        finally:
+            self.conn.execute("COMMIT")
+
+    def last_change(self):
+        """Sequence number of the latest change (0 for an untouched catalog)."""
+        return self.conn.execute("SELECT coalesce(max(seq), 0) FROM changes").fetchone()[0]
+
+    def changes_since(self, seq):
+        """Returns [(seq, title_id, op), ...] recorded after `seq`, oldest first."""
+        return [tuple(row) for row in self.conn.execute(
+            "SELECT seq, title_id, op FROM changes WHERE seq > ? ORDER BY seq", (seq,)
+        )]
+
+    # --- CSV import/export ----------------------------------------------------
+
+    def import_csv(self, csv_path=DEFAULT_CSV_PATH):
+        """Upserts every row of a catalog CSV; returns (written, conflicts)."""
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            return self.upsert_many(csv.DictReader(f))
+
+    def export_csv(self, csv_path=DEFAULT_CSV_PATH):
+        """Writes the catalog to CSV (same columns as movies_data.csv); returns the row count."""
+        tmp_path = csv_path + '.tmp'
+        count = 0
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            for record in self.records():
+                writer.writerow({c: ('None' if v is None else v) for c, v in record.items()})
+                count += 1
+        os.replace(tmp_path, csv_path)
+        return count
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error. Takes the write lock up front."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def open_catalog(db_path=DEFAULT_DB_PATH, csv_path=DEFAULT_CSV_PATH):
+    """
+    Opens the catalog store, creating it from the CSV on first use so
+    existing checkouts keep working without a manual import.
+    """
+    store = CatalogStore(db_path)
+    if store.count() == 0 and csv_path and os.path.exists(csv_path):
+        written, _ = store.import_csv(csv_path)
+        print(f"Imported {written} titles from {csv_path} into {db_path}")
+    return store
+
+
+if __name__ == "__main__":
+    # python catalog_store.py import [movies_data.csv] | export [movies_data.csv]
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python catalog_store.py import|export [csv_path]")
+        sys.exit(1)
+    command = sys.argv[1]
+    path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CSV_PATH
+    with CatalogStore() as store:
+        start = time.perf_counter()
+        if command == "import":
+            written, conflicts = store.import_csv(path)
+            print(f"Imported {written} titles from {path} ({conflicts} conflicts skipped)")
+        else:
+            count = store.export_csv(path)
+            print(f"Exported {count} titles to {path}")
+        print(f"Done in {time.perf_counter() - start:.2f}s")
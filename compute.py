@@ -0,0 +1,126 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import metrics
+
+# The model the workers score against. Worker processes receive their own
+# copy through `_attach_worker` (inherited for free when the platform forks).
+_model = None
+
+
+class PoolSaturated(Exception):
+    """Raised when the compute queue is full; the API answers 503 + Retry-After."""
+    def __init__(self, retry_after):
+        super().__init__("Compute pool is saturated")
+        self.retry_after = retry_after
+
+
+def _attach_worker(model):
+    global _model
+    _model = model
+
+
+def _invoke(method, args, kwargs, submitted_at):
+    """
+    Runs inside a worker: calls a method on the attached model and returns
+    the result along with its Server-Timing phases and time spent queued.
+    """
+    queue_wait = time.time() - submitted_at
+    timing = metrics.ServerTiming()
+    token = metrics.current_timing.set(timing)
+    try:
+        result = getattr(_model, method)(*args, **kwargs)
+    finally:
+        metrics.current_timing.reset(token)
+    return result, timing.entries, queue_wait
+
+
+class ComputePool:
+    """
+    Watchify Compute Pool
+    Runs CPU-bound model calls (scoring, search, ranking) on a dedicated set of
+    workers so they can't starve Starlette's shared threadpool, which serves
+    cheap endpoints and static posters.
+
+    The pool admits at most `workers + queue_size` calls at once; anything beyond
+    that fails fast with `PoolSaturated` instead of queueing without bound.
+    """
+    def __init__(self, mode='thread', workers=4, queue_size=16, retry_after=1):
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"Unknown compute pool mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Builds a pool from WATCHIFY_POOL_* environment variables."""
+        workers = int(os.environ.get("WATCHIFY_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+        return cls(
+            mode=os.environ.get("WATCHIFY_POOL_MODE", "thread"),
+            workers=workers,
+            queue_size=int(os.environ.get("WATCHIFY_POOL_QUEUE", workers * 4)),
+            retry_after=int(os.environ.get("WATCHIFY_POOL_RETRY_AFTER", 1)),
+        )
+
+    def attach(self, model):
+        """Sets the model that workers score against."""
+        global _model
+        _model = model
+        self.model_changed()
+
+    def model_changed(self):
+        """
+        Must be called after the model is rebuilt. Worker processes hold their
+        own copy of the model, so they are replaced on next use.
+        """
+        if self.mode == 'process':
+            self.shutdown()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.mode == 'process':
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        initializer=_attach_worker,
+                        initargs=(_model,),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='watchify-compute'
+                    )
+            return self._executor
+
+    async def run(self, method, *args, **kwargs):
+        """Calls `model.<method>(*args, **kwargs)` on a worker and awaits the result."""
+        if not self._slots.acquire(blocking=False):
+            metrics.POOL_REJECTED.inc()
+            raise PoolSaturated(self.retry_after)
+        metrics.POOL_PENDING.inc()
+        try:
+            future = self._get_executor().submit(_invoke, method, args, kwargs, time.time())
+            result, entries, queue_wait = await asyncio.wrap_future(future)
+        finally:
+            metrics.POOL_PENDING.dec()
+            self._slots.release()
+
+        metrics.POOL_QUEUE_WAIT.observe(queue_wait)
+        timing = metrics.current_timing.get()
+        if timing is not None:
+            timing.add("queue", queue_wait)
+            timing.entries.extend(entries)
+        return result
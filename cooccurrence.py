@@ -0,0 +1,231 @@
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, deque
+
+import metrics
+
+# How much each event type counts towards a co-occurrence
+EVENT_WEIGHTS = {'view': 1.0, 'click': 0.5}
+
+# Accepted event timestamps: at most MAX_EVENT_AGE seconds old, and at most
+# MAX_CLOCK_SKEW seconds ahead of the server clock (those are taken as "now")
+MAX_EVENT_AGE = 30 * 86400
+MAX_CLOCK_SKEW = 300
+
+
+class CooccurrenceModel:
+    """
+    Watchify Co-occurrence Model
+    A sparse item-item matrix of titles that the same user engages with in the
+    same session, maintained incrementally from a stream of events.
+
+    - Each event pairs the title with the (at most `session_items`) titles seen
+      earlier in the user's session, so an update costs O(session_items).
+    - Time decay uses forward decay: an event at time t adds
+      weight * 2^((t - epoch) / half_life), so old scores never have to be
+      rewritten; they simply become small next to newer ones.
+    - Each item keeps at most `top_k` neighbours (pruned from 2 * top_k), which
+      bounds memory at O(items * top_k).
+    """
+    # Rescale everything once boosts reach 2^REBASE_EXPONENT, far from float overflow
+    REBASE_EXPONENT = 256
+
+    def __init__(self, half_life_days=14.0, session_gap=1800, session_items=20, top_k=50, max_sessions=100000):
+        self.half_life = half_life_days * 86400.0
+        self.session_gap = session_gap
+        self.session_items = session_items
+        self.top_k = top_k
+        self.max_sessions = max_sessions
+        self.neighbours = {}            # title_id -> {title_id: decayed score}
+        self.sessions = OrderedDict()   # user -> deque of (title_id, ts), least recent user first
+        self.epoch = None
+        self.events = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add(self, user, title_id, ts=None, weight=1.0):
+        """Folds one event (user engaged with title_id at time ts) into the matrix."""
+        # Never trust a timestamp from the future: rebasing onto it would zero every score
+        now = time.time()
+        ts = now if ts is None else min(ts, now)
+        with self._lock:
+            if self.epoch is None:
+                self.epoch = ts
+            if (ts - self.epoch) / self.half_life > self.REBASE_EXPONENT:
+                self._rebase(ts)
+
+            session = self.sessions.pop(user, None)
+            if session is None or (session and ts - session[-1][1] > self.session_gap):
+                session = deque(maxlen=self.session_items)
+            self.sessions[user] = session
+            if len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+
+            boost = weight * 2.0 ** ((ts - self.epoch) / self.half_life)
+            for other, _ in session:
+                if other != title_id:
+                    self._bump(title_id, other, boost)
+                    self._bump(other, title_id, boost)
+
+            # Keep each title once per session, at its most recent position
+            if any(other == title_id for other, _ in session):
+                kept = [entry for entry in session if entry[0] != title_id]
+                session.clear()
+                session.extend(kept)
+            session.append((title_id, ts))
+            self.events += 1
+
+    def _bump(self, title_id, other, amount):
+        row = self.neighbours.setdefault(title_id, {})
+        row[other] = row.get(other, 0.0) + amount
+        if len(row) > 2 * self.top_k:
+            top = sorted(row.items(), key=lambda item: item[1], reverse=True)[:self.top_k]
+            self.neighbours[title_id] = dict(top)
+
+    def _rebase(self, ts):
+        """Moves the decay epoch to `ts`, scaling every stored score to match."""
+        factor = 2.0 ** (-(ts - self.epoch) / self.half_life)
+        for row in self.neighbours.values():
+            for other in row:
+                row[other] *= factor
+        self.epoch = ts
+
+    def neighbours_of(self, title_id, limit=None):
+        """
+        Returns {title_id: score} for the titles most often engaged with alongside
+        `title_id`, scaled so the strongest neighbour scores 1.0.
+        """
+        with self._lock:
+            row = self.neighbours.get(title_id)
+            if not row:
+                return {}
+            items = sorted(row.items(), key=lambda item: item[1], reverse=True)[:limit or self.top_k]
+        top = items[0][1]
+        return {other: score / top for other, score in items if score > 0}
+
+    @property
+    def size(self):
+        """Number of stored (item, neighbour) entries."""
+        return sum(len(row) for row in self.neighbours.values())
+
+
+class FeedbackAggregator:
+    """
+    Watchify Feedback Aggregator
+    Appends implicit-feedback events (views, clicks) to a JSON-lines log and
+    streams them into a CooccurrenceModel. The model is checkpointed along with
+    the log offset it covers, so a restart only replays the events logged since.
+    """
+    def __init__(self, log_path='events.log', checkpoint_path=None, checkpoint_every=10000, **model_options):
+        self.log_path = log_path
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.model = CooccurrenceModel(**model_options)
+        self.offset = 0   # bytes of the log folded into the model
+        self.restored = threading.Event()   # set once restore() has replayed the log
+        self._log_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, cache_dir='.watchify_cache'):
+        """Builds an aggregator configured by WATCHIFY_EVENT_LOG / WATCHIFY_COOC_* variables."""
+        return cls(
+            log_path=os.environ.get("WATCHIFY_EVENT_LOG", "events.log"),
+            checkpoint_path=os.path.join(cache_dir, 'cooccurrence.pkl') if cache_dir else None,
+            half_life_days=float(os.environ.get("WATCHIFY_COOC_HALF_LIFE_DAYS", 14)),
+            top_k=int(os.environ.get("WATCHIFY_COOC_TOP_K", 50)),
+        )
+
+    def ingest(self, events):
+        """
+        Logs and aggregates a batch of events, each a dict with user, title_id,
+        type and ts. Returns the number of events ingested. Only valid once
+        restore() has run, since the offset must cover the existing log.
+        """
+        if not self.restored.is_set():
+            raise RuntimeError("Feedback model has not been restored yet")
+        if not events:
+            return 0
+        lines = ''.join(json.dumps(e, separators=(',', ':')) + '\n' for e in events).encode('utf-8')
+        with self._log_lock:
+            with open(self.log_path, 'ab') as f:
+                f.write(lines)
+                offset = f.tell()
+            for event in events:
+                self._apply(event)
+            self.offset = offset
+            due = self.checkpoint_every and self.model.events % self.checkpoint_every < len(events)
+        if due:
+            self.checkpoint()
+        metrics.COOCCURRENCE_ENTRIES.set(self.model.size)
+        return len(events)
+
+    def _apply(self, event):
+        self.model.add(event['user'], event['title_id'], event['ts'], EVENT_WEIGHTS.get(event['type'], 1.0))
+        metrics.FEEDBACK_EVENTS.labels(event['type']).inc()
+
+    def restore(self):
+        """Loads the last checkpoint, then replays the events logged after it."""
+        try:
+            return self._restore()
+        finally:
+            self.restored.set()
+
+    def _restore(self):
+        with self._log_lock:
+            if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+                try:
+                    with open(self.checkpoint_path, 'rb') as f:
+                        self.model, self.offset = pickle.load(f)
+                except Exception as e:
+                    print(f"Ignoring unreadable co-occurrence checkpoint: {e}")
+            if not os.path.exists(self.log_path):
+                return 0
+            if os.path.getsize(self.log_path) < self.offset:
+                # The log was truncated or replaced: rebuild from scratch
+                self.model, self.offset = CooccurrenceModel(**self._model_options()), 0
+
+            replayed = 0
+            with open(self.log_path, 'rb') as f:
+                f.seek(self.offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break   # partially written last line
+                    self.offset += len(line)
+                    try:
+                        self._apply(json.loads(line))
+                        replayed += 1
+                    except (ValueError, KeyError, TypeError) as e:
+                        print(f"Skipping malformed event: {e}")
+        metrics.COOCCURRENCE_ENTRIES.set(self.model.size)
+        return replayed
+
+    def _model_options(self):
+        m = self.model
+        return dict(half_life_days=m.half_life / 86400.0, session_gap=m.session_gap,
+                    session_items=m.session_items, top_k=m.top_k, max_sessions=m.max_sessions)
+
+    def checkpoint(self):
+        """Saves the model and the log offset it covers."""
+        if not self.checkpoint_path:
+            return
+        with self._log_lock:
+            state = pickle.dumps((self.model, self.offset), protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            os.makedirs(os.path.dirname(self.checkpoint_path) or '.', exist_ok=True)
+            tmp_path = self.checkpoint_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(state)
+            os.replace(tmp_path, self.checkpoint_path)
+        except OSError as e:
+            print(f"Could not write co-occurrence checkpoint: {e}")
@@ -0,0 +1,295 @@
+import re
+import sys
+import unicodedata
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+# MinHash/LSH settings: 128 permutations in 32 bands of 4 rows puts the
+# LSH collision threshold around a Jaccard similarity of (1/32)^(1/4) ~ 0.42.
+NUM_PERM = 128
+BANDS = 32
+HASH_PRIME = (1 << 31) - 1
+
+# Blocks larger than this are too generic to be useful ('the', 'star wars'...)
+MAX_BLOCK_SIZE = 50
+
+# Verification thresholds (see `is_duplicate`)
+TITLE_MATCH = 0.75
+TITLE_CONTAINMENT = 0.9
+PLOT_SUPPORT = 0.12
+PLOT_MATCH = 0.5
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'he', 'her', 'his',
+    'in', 'into', 'is', 'it', 'its', 'of', 'on', 'or', 'she', 'that', 'the', 'their', 'they',
+    'this', 'to', 'was', 'who', 'with', 'when', 'while', 'but', 'not', 'one', 'all', 'after',
+}
+
+ROMAN_NUMERALS = {'ii': '2', 'iii': '3', 'iv': '4', 'v': '5', 'vi': '6', 'vii': '7', 'viii': '8', 'ix': '9', 'x': '10'}
+
+
+def normalize_title(name):
+    """
+    Folds a title to a comparable form: ASCII, lowercase, '&' as 'and', no
+    punctuation or leading 'the'. A '(2011)' year is dropped.
+    'Demon Slayer -Kimetsu no Yaiba-' and 'Demon Slayer: Kimetsu no Yaiba' match.
+    """
+    if not name:
+        return ''
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode().lower()
+    text = re.sub(r'\(\s*\d{4}\s*\)', ' ', text).replace('&', ' and ')
+    text = re.sub(r"['\u2019]", '', text)
+    text = ' '.join(re.sub(r'[^a-z0-9]+', ' ', text).split())
+    return text[4:] if text.startswith('the ') else text
+
+
+def title_year_hint(name):
+    """Year written in the title itself, e.g. 'Hunter x Hunter (2011)'."""
+    match = re.search(r'\((\d{4})\)', str(name or ''))
+    return int(match.group(1)) if match else None
+
+
+def sequel_markers(title):
+    """
+    Numbers that tell installments apart: '2', 'ii', '2nd', 'season 2', 'part 3'.
+    Titles only match when their markers are identical, so 'My Hero Academia' and
+    'My Hero Academia 2' stay separate titles.
+    """
+    markers = set()
+    for token in title.split():
+        ordinal = re.fullmatch(r'(\d+)(?:st|nd|rd|th)?', token)
+        if ordinal:
+            markers.add(str(int(ordinal.group(1))))
+        elif token in ROMAN_NUMERALS and token != 'x':
+            # 'x' is far more often a word ('Hunter x Hunter') than a 10
+            markers.add(ROMAN_NUMERALS[token])
+    return frozenset(markers)
+
+
+def title_shingles(title):
+    """Character 3-grams of the title, with word boundaries marked."""
+    text = f" {title} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def plot_words(plot):
+    """Content words of a plot, for plot overlap between different synopses."""
+    if not plot:
+        return set()
+    words = re.findall(r'[a-z0-9]+', unicodedata.normalize('NFKD', str(plot)).encode('ascii', 'ignore').decode().lower())
+    return {w for w in words if w not in STOP_WORDS and len(w) > 2}
+
+
+def plot_shingles(plot):
+    """Word 3-grams of a plot, for catching copied synopses."""
+    if not plot:
+        return set()
+    words = re.findall(r'[a-z0-9]+', str(plot).lower())
+    return {' '.join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def containment(a, b):
+    """Share of the smaller set contained in the larger one (subtitle variants)."""
+    return len(a & b) / min(len(a), len(b)) if a and b else 0.0
+
+
+class MinHasher:
+    """
+    Watchify MinHasher
+    Estimates Jaccard similarity of shingle sets with NUM_PERM universal hash
+    permutations, h(x) = (a*x + b) mod p, evaluated for all shingles at once.
+    """
+    def __init__(self, num_perm=NUM_PERM, seed=42):
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, HASH_PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, HASH_PRIME, size=num_perm).astype(np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, shingles):
+        """MinHash signature of a set of strings (all-max for an empty set)."""
+        if not shingles:
+            return np.full(self.num_perm, HASH_PRIME, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) & HASH_PRIME for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        # a, x < 2^31, so a*x + b stays well within uint64
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % HASH_PRIME).min(axis=1)
+
+
+class LSHIndex:
+    """
+    Watchify LSH Index
+    Splits MinHash signatures into bands; titles sharing any band land in the
+    same bucket and become candidate pairs. Each title is hashed once, so
+    candidate generation is roughly linear in the catalog size.
+    """
+    def __init__(self, bands=BANDS):
+        self.bands = bands
+        self.buckets = defaultdict(list)
+
+    def add(self, key, signature):
+        for band, rows in enumerate(np.array_split(signature, self.bands)):
+            self.buckets[(band, rows.tobytes())].append(key)
+
+    def candidate_pairs(self):
+        pairs = set()
+        for keys in self.buckets.values():
+            if 1 < len(keys) <= MAX_BLOCK_SIZE:
+                for i, left in enumerate(keys):
+                    for right in keys[i + 1:]:
+                        pairs.add((left, right) if left < right else (right, left))
+        return pairs
+
+
+class TitleFeatures:
+    """Normalized view of one catalog record used for matching."""
+    def __init__(self, record):
+        self.id = record['ID']
+        self.title = normalize_title(record.get('Name'))
+        self.year = record.get('Year') or title_year_hint(record.get('Name'))
+        self.markers = sequel_markers(self.title)
+        self.title_shingles = title_shingles(self.title)
+        self.plot_words = plot_words(record.get('Plot'))
+        self.plot_shingles = plot_shingles(record.get('Plot'))
+        words = self.title.split()
+        # Blocking key: the first two words of the title ('code geass', 'hunter x')
+        self.block = ' '.join(words[:2]) if words else None
+
+
+def years_compatible(left, right, tolerance=1):
+    """Sources disagree on release years by a year at most (airing vs. premiere dates)."""
+    if left.year is None or right.year is None:
+        return True
+    try:
+        return abs(int(left.year) - int(right.year)) <= tolerance
+    except (TypeError, ValueError):
+        return True
+
+
+def is_duplicate(left, right):
+    """
+    Decides whether two candidate titles are the same work. They need identical
+    sequel markers and compatible years, and then one of:
+    - near-identical titles ('One-Punch Man' / 'One Punch Man')
+    - one title containing the other, backed by overlapping plots
+      ('Code Geass' / 'Code Geass: Lelouch of the Rebellion')
+    - a copied synopsis under a translated title
+    """
+    if left.markers != right.markers or not years_compatible(left, right):
+        return False
+    if left.year is None or right.year is None:
+        # Without a year to confirm, only accept exact title matches
+        return left.title == right.title and bool(left.title)
+    if jaccard(left.title_shingles, right.title_shingles) >= TITLE_MATCH:
+        return True
+    if (containment(left.title_shingles, right.title_shingles) >= TITLE_CONTAINMENT
+            and jaccard(left.plot_words, right.plot_words) >= PLOT_SUPPORT):
+        return True
+    return jaccard(left.plot_shingles, right.plot_shingles) >= PLOT_MATCH
+
+
+def candidate_pairs(features):
+    """
+    Candidate pairs from three cheap sources: exact blocking on the first title
+    words, LSH over title shingles (spelling variants), and LSH over plot
+    shingles (copied synopses with a different title).
+    """
+    hasher = MinHasher()
+    title_index, plot_index = LSHIndex(), LSHIndex()
+    blocks = defaultdict(list)
+    for f in features.values():
+        title_index.add(f.id, hasher.signature(f.title_shingles))
+        if f.plot_shingles:
+            plot_index.add(f.id, hasher.signature(f.plot_shingles))
+        if f.block:
+            blocks[f.block].append(f.id)
+
+    pairs = title_index.candidate_pairs() | plot_index.candidate_pairs()
+    for ids in blocks.values():
+        if 1 < len(ids) <= MAX_BLOCK_SIZE:
+            for i, left in enumerate(ids):
+                for right in ids[i + 1:]:
+                    pairs.add((left, right) if left < right else (right, left))
+    return pairs
+
+
+def find_duplicates(records):
+    """
+    Clusters duplicate records. Returns (clusters, candidates): clusters is a
+    list of ID lists with two or more members, candidates the number of
+    pairs that were compared.
+    """
+    features = {r['ID']: TitleFeatures(r) for r in records}
+    pairs = candidate_pairs(features)
+
+    # Union-find over the verified pairs
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for left, right in pairs:
+        if is_duplicate(features[left], features[right]):
+            parent[find(left)] = find(right)
+
+    clusters = defaultdict(list)
+    for title_id in parent:
+        clusters[find(title_id)].append(title_id)
+    return [sorted(ids) for ids in clusters.values() if len(ids) > 1], len(pairs)
+
+
+def merge_records(records):
+    """
+    Picks the canonical record of a cluster (the most complete one, then the
+    lowest ID) and fills its missing fields from the other members.
+    Returns (canonical record, duplicate IDs).
+    """
+    def completeness(r):
+        filled = sum(v is not None and v != '' for v in r.values())
+        return (-filled, -len(r.get('Plot') or ''), r['ID'])
+
+    ordered = sorted(records, key=completeness)
+    canonical = dict(ordered[0])
+    for other in ordered[1:]:
+        for column, value in other.items():
+            if canonical.get(column) in (None, '') and value not in (None, ''):
+                canonical[column] = value
+    return canonical, [r['ID'] for r in ordered[1:]]
+
+
+def resolve_duplicates(store, dry_run=False):
+    """
+    Entity-resolution stage: finds duplicate titles in the catalog store and
+    merges each cluster into its canonical record. Merged-away Source_URLs are
+    kept as aliases, so rescraping them doesn't bring the duplicates back.
+    Returns the list of (canonical record, duplicate IDs).
+    """
+    records = {r['ID']: r for r in store.records()}
+    clusters, candidates = find_duplicates(records.values())
+    print(f"Compared {candidates} candidate pairs; found {len(clusters)} duplicate clusters.")
+
+    merges = []
+    for ids in clusters:
+        canonical, duplicates = merge_records([records[i] for i in ids])
+        merges.append((canonical, duplicates))
+        names = ', '.join(repr(records[i]['Name']) for i in duplicates)
+        print(f"  {canonical['Name']!r} ({canonical.get('Year')}) <- {names}")
+        if not dry_run:
+            store.merge(canonical, duplicates)
+    return merges
+
+
+if __name__ == "__main__":
+    # python dedupe.py [--dry-run]
+    from catalog_store import open_catalog
+    with open_catalog() as store:
+        resolve_duplicates(store, dry_run='--dry-run' in sys.argv[1:])
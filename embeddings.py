@@ -0,0 +1,92 @@
+import numpy as np
+
+# Rows of int8 codes widened to float32 at a time when scoring (~2MB at dim=128)
+CHUNK_ROWS = 4096
+
+# Candidate sets smaller than 1/SPARSE_CANDIDATES of the catalog are scored
+# row by row; larger ones with a full pass, which streams the matrix in order
+SPARSE_CANDIDATES = 4
+
+
+class LSAEmbeddings:
+    """
+    Watchify LSA Embeddings
+    Projects the bag-of-words tag vectors into a small dense space with truncated
+    SVD (Latent Semantic Analysis). Titles that share related words, not just the
+    exact same tokens, end up close together, and scoring a title is a single
+    (N x dim) matrix-vector product instead of a row of an N x N matrix.
+
+    Vectors are unit-normalized, so a dot product is the cosine similarity.
+    With dtype='int8' each vector is quantized with its own scale factor,
+    cutting memory 4x versus float32 at a small loss in precision.
+    """
+    def __init__(self, vectors, scales=None):
+        self.vectors = vectors
+        self.scales = scales
+
+    @classmethod
+    def fit(cls, counts, dim=128, dtype='float32'):
+        """Builds embeddings from a (sparse) document-term count matrix."""
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.preprocessing import normalize
+
+        if dtype not in ('float32', 'int8'):
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+
+        # Normalize documents first so long plots don't dominate the components
+        counts = normalize(counts.astype(np.float64))
+        dim = max(1, min(dim, counts.shape[0] - 1, counts.shape[1] - 1))
+        svd = TruncatedSVD(n_components=dim, random_state=42)
+        vectors = normalize(svd.fit_transform(counts)).astype(np.float32)
+
+        if dtype == 'float32':
+            return cls(vectors)
+
+        # Symmetric per-row int8 quantization: x ~= codes * scale
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return cls(codes, scales.astype(np.float32))
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def similarities(self, index, candidates=None):
+        """
+        Cosine similarity between title `index` and the candidate rows (default: all).
+        A large candidate set is scored with one pass over the whole matrix in
+        place, then picked out of the result. A small one (a narrow facet filter)
+        only scores its own rows, gathered CHUNK_ROWS at a time, so filtering
+        still cuts the work without ever copying more than a chunk.
+        """
+        query = self.vectors[index] if self.scales is None else self.vectors[index].astype(np.float32)
+        if candidates is None or len(candidates) * SPARSE_CANDIDATES >= len(self.vectors):
+            scores = np.empty(len(self.vectors), dtype=np.float32)
+            for start in range(0, len(self.vectors), CHUNK_ROWS):
+                self._score(self.vectors[start:start + CHUNK_ROWS], query, scores[start:start + CHUNK_ROWS])
+            if self.scales is not None:
+                scores *= self.scales * self.scales[index]
+            return scores if candidates is None else scores[candidates]
+
+        candidates = np.asarray(candidates)
+        scores = np.empty(len(candidates), dtype=np.float32)
+        for start in range(0, len(candidates), CHUNK_ROWS):
+            rows = np.take(self.vectors, candidates[start:start + CHUNK_ROWS], axis=0)
+            self._score(rows, query, scores[start:start + CHUNK_ROWS])
+        if self.scales is not None:
+            scores *= self.scales[candidates] * self.scales[index]
+        return scores
+
+    def _score(self, rows, query, out):
+        if self.scales is None:
+            np.matmul(rows, query, out=out)
+        else:
+            # int8 dot products are exact in float32 (|sum| < 2**24 for dim <= 1024),
+            # which keeps the product on the BLAS fast path; widening one chunk at
+            # a time keeps the temporary small instead of a float32 copy of the matrix.
+            np.matmul(rows.astype(np.float32), query, out=out)
@@ -0,0 +1,122 @@
+import re
+
+import numpy as np
+
+# Spellings used by the different sources for the same genre
+GENRE_ALIASES = {
+    'sci-fi': 'science fiction',
+    'sci fi': 'science fiction',
+    'scifi': 'science fiction',
+}
+
+
+def split_genres(genres):
+    """
+    Splits a comma-joined Genres value into normalized genre names.
+    Combined TV genres such as 'Sci-Fi & Fantasy' count as both genres.
+    """
+    if not genres:
+        return []
+    names = []
+    for part in re.split(r',|&', str(genres)):
+        name = ' '.join(part.lower().split())
+        if name:
+            names.append(GENRE_ALIASES.get(name, name))
+    return names
+
+
+class FacetIndex:
+    """
+    Watchify Facet Index
+    Bitmap indexes over the catalog, built once per model: one boolean array per
+    genre and per category, plus bucketed arrays for year (by decade) and rating
+    score (by 10 points). A filter is evaluated as the bitwise AND of the relevant
+    bitmaps, so adding facets makes a query cheaper to score, not more expensive.
+    """
+    YEAR_BUCKET = 10
+    SCORE_BUCKET = 10
+
+    def __init__(self, movies):
+        self.size = len(movies)
+
+        # Genres are coded in order of first appearance; one bitmap row per code
+        self.genre_codes = {}
+        rows = []
+        for position, genres in enumerate(movies['Genres']):
+            for name in split_genres(genres):
+                code = self.genre_codes.setdefault(name, len(self.genre_codes))
+                rows.append((code, position))
+        self.genre_bitmaps = np.zeros((len(self.genre_codes), self.size), dtype=bool)
+        if rows:
+            codes, positions = zip(*rows)
+            self.genre_bitmaps[list(codes), list(positions)] = True
+
+        categories = movies['Category'].str.lower().to_numpy()
+        self.category_bitmaps = {c: categories == c for c in np.unique(categories)}
+
+        self.years = self._numeric(movies, 'Year')
+        self.year_buckets = self._bucketize(self.years, self.YEAR_BUCKET)
+        self.scores = self._numeric(movies, 'Score')
+        self.score_buckets = self._bucketize(self.scores, self.SCORE_BUCKET)
+
+    @staticmethod
+    def _numeric(movies, column):
+        if column not in movies.columns:
+            return np.full(len(movies), np.nan)
+        return movies[column].astype('float64').to_numpy()
+
+    @staticmethod
+    def _bucketize(values, width):
+        """Maps bucket start -> bitmap of rows whose value falls in [start, start + width)."""
+        known = ~np.isnan(values)
+        starts = np.full(len(values), np.nan)
+        starts[known] = np.floor(values[known] / width) * width
+        return {float(b): starts == b for b in np.unique(starts[known])}
+
+    def _range(self, buckets, values, width, low, high):
+        """Bitmap of rows with low <= value <= high, from whole buckets plus refined edges."""
+        result = np.zeros(self.size, dtype=bool)
+        for start, bitmap in buckets.items():
+            end = start + width
+            if (low is not None and end <= low) or (high is not None and start > high):
+                continue
+            if (low is None or start >= low) and (high is None or end <= high):
+                # Bucket lies entirely inside the range
+                result |= bitmap
+                continue
+            # Edge bucket: check the exact values of its rows only
+            edge = bitmap.copy()
+            if low is not None:
+                edge &= values >= low
+            if high is not None:
+                edge &= values <= high
+            result |= edge
+        return result
+
+    def mask(self, category=None, genres=None, year_min=None, year_max=None, rating_min=None, rating_max=None):
+        """
+        Returns a boolean array selecting the titles that match every given facet,
+        or None when no facet is set (i.e. everything matches).
+        `genres` is an iterable (or comma-separated string) of genres that must all match.
+        """
+        bitmaps = []
+        if category:
+            bitmaps.append(self.category_bitmaps.get(category.lower(), np.zeros(self.size, dtype=bool)))
+        if genres:
+            if isinstance(genres, str):
+                genres = genres.split(',')
+            for genre in genres:
+                for name in split_genres(genre):
+                    code = self.genre_codes.get(name)
+                    bitmaps.append(self.genre_bitmaps[code] if code is not None else np.zeros(self.size, dtype=bool))
+        if year_min is not None or year_max is not None:
+            bitmaps.append(self._range(self.year_buckets, self.years, self.YEAR_BUCKET, year_min, year_max))
+        if rating_min is not None or rating_max is not None:
+            bitmaps.append(self._range(self.score_buckets, self.scores, self.SCORE_BUCKET, rating_min, rating_max))
+
+        if not bitmaps:
+            return None
+        result = bitmaps[0].copy()
+        for bitmap in bitmaps[1:]:
+            result &= bitmap
+        return result
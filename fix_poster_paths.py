@@ -1,8 +1,9 @@
-import pandas as pd
 import os
+from catalog_store import open_catalog
 
-# Load the CSV
-df = pd.read_csv('movies_data.csv')
+# Load the catalog
+store = open_catalog()
+records = list(store.records())
 
 # Function to fix poster paths
 def fix_poster_path(row):
@@ -25,12 +26,15 @@ def fix_poster_path(row):
 
 # Apply the fix
 print("Fixing poster paths...")
-df['Poster_Path'] = df.apply(fix_poster_path, axis=1)
+for row in records:
+    row['Poster_Path'] = fix_poster_path(row)
 
-# Save the updated CSV
-df.to_csv('movies_data.csv', index=False)
-print(f"Updated {len(df)} entries")
+# Save the updated paths (unchanged rows don't touch the change log)
+store.upsert_many({'ID': row['ID'], 'Poster_Path': row['Poster_Path']} for row in records)
+print(f"Updated {len(records)} entries")
 
 # Show sample of fixed paths
 print("\nSample of poster paths:")
-print(df[['Name', 'Poster_Path']].head(10))
+for row in records[:10]:
+    print(f"{row['Name']}: {row['Poster_Path']}")
+store.close()
@@ -6,9 +6,9 @@ import DynamicHero from '../components/DynamicHero';
 import ContentGrid from '../components/ContentGrid';
 import {
   WatchifyTitle,
-  fetchTitles,
-  fetchTrending,
-  searchTitles
+  fetchHome,
+  searchTitles,
+  sendFeedback
 } from '../lib/api';
 
 export default function Home() {
@@ -27,40 +27,31 @@ export default function Home() {
       try {
         console.log('Watchify: Starting data fetch...');
 
-        const fetchResults = await Promise.allSettled([
-          fetchTrending(12),
-          fetchTitles('Movie', 1, 12),
-          fetchTitles('TV Show', 1, 12),
-          fetchTitles('Anime', 1, 12)
-        ]);
+        // All rails come from one precomputed, ETag-cached response
+        const rails = await fetchHome({ trending: 12, movies: 12, tv_shows: 12, anime: 12 });
 
         console.log('Watchify: Fetch complete. Processing results...');
 
-        const trendingData = fetchResults[0].status === 'fulfilled' ? fetchResults[0].value : [];
-        const moviesData = fetchResults[1].status === 'fulfilled' ? fetchResults[1].value : { titles: [] };
-        const tvData = fetchResults[2].status === 'fulfilled' ? fetchResults[2].value : { titles: [] };
-        const animeData = fetchResults[3].status === 'fulfilled' ? fetchResults[3].value : { titles: [] };
-
         console.log('Watchify Debug:', {
-          trendingCount: trendingData.length,
-          moviesCount: moviesData.titles?.length,
-          tvCount: tvData.titles?.length
+          trendingCount: rails.trending.length,
+          moviesCount: rails.movies.length,
+          tvCount: rails.tv_shows.length
         });
 
-        setTrending(trendingData);
-        setMovies(moviesData.titles || []);
-        setTvShows(tvData.titles || []);
-        setAnime(animeData.titles || []);
+        setTrending(rails.trending);
+        setMovies(rails.movies);
+        setTvShows(rails.tv_shows);
+        setAnime(rails.anime);
 
         // Simulate recently watched (take a mix of random items)
-        const allContent = [...(moviesData.titles || []), ...(tvData.titles || [])];
+        const allContent = [...rails.movies, ...rails.tv_shows];
         const recent = allContent.sort(() => 0.5 - Math.random()).slice(0, 12);
         setRecentlyWatched(recent);
 
-        if (trendingData.length > 0) {
-          console.log('Watchify: Selecting title from trending:', trendingData[0].Name);
-        } else if (moviesData.titles?.length > 0) {
-          console.log('Watchify: Selecting title from movies:', moviesData.titles[0].Name);
+        if (rails.trending.length > 0) {
+          console.log('Watchify: Selecting title from trending:', rails.trending[0].Name);
+        } else if (rails.movies.length > 0) {
+          console.log('Watchify: Selecting title from movies:', rails.movies[0].Name);
         } else {
           console.warn('Watchify: No titles found to select!');
         }
@@ -72,7 +63,8 @@ export default function Home() {
     loadInitialData();
   }, []);
 
-  const handleTitleSelect = async () => {
+  const handleTitleSelect = async (item: WatchifyTitle) => {
+    sendFeedback(item.ID, 'click');
     window.scrollTo({ top: 0, behavior: 'smooth' });
   };
 
@@ -97,7 +89,7 @@ export default function Home() {
     if (query.trim().length > 2) {
       setIsSearching(true);
       try {
-        const results = await searchTitles(query);
+        const results = await searchTitles(query, 'card');
         setSearchResults(results);
       } catch (error) {
         console.error('Search error:', error);
@@ -57,7 +57,7 @@ const DynamicHero: React.FC<DynamicHeroProps> = ({ titles }) => {
     const maxRating = title.Rating ? title.Rating.split('/')[1]?.trim() : '10';
 
     // Get genres
-    const genres = title.Genres.split(',').map(g => g.trim()).slice(0, 3);
+    const genres = title.Genres ? title.Genres.split(',').map(g => g.trim()).slice(0, 3) : [];
 
     return (
         <div className="relative w-full min-h-screen overflow-hidden bg-slate-950">
@@ -42,7 +42,7 @@ const Hero: React.FC<HeroProps> = ({ title, onPlay, onInfo }) => {
                 </h1>
 
                 <div className="flex items-center gap-3 text-white font-medium">
-                    <span className="text-green-500 font-bold">{title.Rating} Rating</span>
+                    <span className="text-green-500 font-bold">{title.Rating ?? 'N/A'} Rating</span>
                     <span>{title.Year}</span>
                 </div>
 
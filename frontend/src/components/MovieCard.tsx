@@ -26,7 +26,7 @@ const MovieCard: React.FC<MovieCardProps> = ({ movie, onClick, isSelected }) =>
                     }}
                 />
                 <div className="absolute inset-0 bg-gradient-to-t from-black/80 via-transparent to-transparent opacity-0 transition-opacity duration-300 group-hover:opacity-100 flex flex-col justify-end p-4">
-                    <p className="text-xs font-semibold text-blue-400 capitalize">{movie.Genres.split(',')[0]}</p>
+                    <p className="text-xs font-semibold text-blue-400 capitalize">{movie.Genres ? movie.Genres.split(',')[0] : ''}</p>
                     <p className="text-sm font-bold text-white line-clamp-2">{movie.Name}</p>
                 </div>
             </div>
@@ -35,7 +35,7 @@ const MovieCard: React.FC<MovieCardProps> = ({ movie, onClick, isSelected }) =>
                 <div className="flex items-center justify-between mt-1 text-xs text-zinc-500 dark:text-zinc-400">
                     <span>{movie.Year}</span>
                     <span className="flex items-center gap-1 text-yellow-500">
-                        ★ {movie.Rating.split('/')[0].trim() || 'N/A'}
+                        ★ {movie.Rating ? movie.Rating.split('/')[0].trim() || 'N/A' : 'N/A'}
                     </span>
                 </div>
             </div>
@@ -41,7 +41,7 @@ const WatchifyCard: React.FC<WatchifyCardProps> = ({ title, onClick, isSelected
                     </div>
                     <h3 className="text-white text-sm font-bold truncate">{title.Name}</h3>
                     <div className="flex items-center gap-2 text-[10px] text-gray-300 mt-1">
-                        <span className="text-green-500 font-bold">{title.Rating}</span>
+                        <span className="text-green-500 font-bold">{title.Rating ?? 'N/A'}</span>
                         <span>{title.Year}</span>
                         <span className="border border-gray-500 px-1 rounded-sm uppercase">{title.Category}</span>
                     </div>
@@ -1,25 +1,34 @@
 const API_BASE_URL = 'http://localhost:8000';
 
 export interface WatchifyTitle {
+    ID: number;
     Name: string;
-    Year: string;
-    Rating: string;
-    Genres: string;
-    Actors: string;
-    Plot: string;
-    Poster_Path: string;
+    Year: number | null;
+    Rating: string | null; // display string as scraped, e.g. "94 / 100" or "4.4"
+    Score: number | null;  // Rating normalized to 0-100
+    Genres: string | null; // blank fields come back as null
+    Actors: string | null;
+    Plot: string | null;
+    Poster_Path: string | null;
     Source_URL: string;
     Category: 'Movie' | 'TV Show' | 'Anime' | string;
 }
 
+/**
+ * Field projections understood by the API: 'full' (default), 'card' (only what
+ * grid cards render, no Plot/Actors/Source_URL) or a comma-separated column list.
+ */
+export type FieldProjection = 'full' | 'card' | string;
+
 /**
  * Fetches titles from the API, optionally filtered by category.
  */
-export async function fetchTitles(category?: string, page: number = 1, limit: number = 20) {
+export async function fetchTitles(category?: string, page: number = 1, limit: number = 20, fields?: FieldProjection) {
     const url = new URL(`${API_BASE_URL}/titles`);
     url.searchParams.append('page', page.toString());
     url.searchParams.append('limit', limit.toString());
     if (category) url.searchParams.append('category', category);
+    if (fields) url.searchParams.append('fields', fields);
 
     const response = await fetch(url.toString());
     if (!response.ok) throw new Error('Failed to fetch titles');
@@ -27,39 +36,123 @@ export async function fetchTitles(category?: string, page: number = 1, limit: nu
 }
 
 /**
- * Fetches trending titles.
+ * Fetches one keyset page of titles. Start with an empty cursor and pass back
+ * `next_cursor` until it is null; pages stay consistent across catalog reloads.
+ */
+export async function fetchTitlesAfter(cursor: string = '', limit: number = 20, category?: string, fields?: FieldProjection) {
+    const url = new URL(`${API_BASE_URL}/titles`);
+    url.searchParams.append('cursor', cursor);
+    url.searchParams.append('limit', limit.toString());
+    if (category) url.searchParams.append('category', category);
+    if (fields) url.searchParams.append('fields', fields);
+
+    const response = await fetch(url.toString());
+    if (!response.ok) throw new Error('Failed to fetch titles');
+    return response.json() as Promise<{ titles: WatchifyTitle[]; next_cursor: string | null; limit: number; generation: number; catalog_changed: boolean }>;
+}
+
+/**
+ * Fetches trending titles, optionally for a single category.
  */
-export async function fetchTrending(count: number = 12) {
-    const response = await fetch(`${API_BASE_URL}/trending?count=${count}`);
+export async function fetchTrending(count: number = 12, category?: string) {
+    let url = `${API_BASE_URL}/trending?count=${count}`;
+    if (category) url += `&category=${encodeURIComponent(category)}`;
+
+    const response = await fetch(url);
     if (!response.ok) throw new Error('Failed to fetch trending');
     return response.json();
 }
 
+export interface HomeRails {
+    trending: WatchifyTitle[];
+    movies: WatchifyTitle[];
+    tv_shows: WatchifyTitle[];
+    anime: WatchifyTitle[];
+}
+
+export type HomeRailSizes = Partial<Record<keyof HomeRails, number>>;
+
+/**
+ * Fetches every landing-page rail in one request. The response carries an
+ * ETag, so repeat visits are revalidated with a cheap 304 by the browser cache.
+ * Category rails come in the compact 'card' projection.
+ * While the API is still loading its model it answers 503 with Retry-After;
+ * the request is retried after that delay for up to `maxWaitMs`.
+ */
+export async function fetchHome(sizes: HomeRailSizes = {}, maxWaitMs: number = 120000): Promise<HomeRails> {
+    const params = new URLSearchParams();
+    for (const [rail, size] of Object.entries(sizes)) {
+        if (size !== undefined) params.set(rail, String(size));
+    }
+    const query = params.toString();
+    const deadline = Date.now() + maxWaitMs;
+    for (;;) {
+        const response = await fetch(`${API_BASE_URL}/home${query ? `?${query}` : ''}`);
+        if (response.ok) return response.json();
+        if (response.status !== 503 || Date.now() >= deadline) throw new Error('Failed to fetch home rails');
+        const retryAfter = Number(response.headers.get('Retry-After')) || 1;
+        await new Promise(resolve => setTimeout(resolve, Math.min(retryAfter * 1000, Math.max(deadline - Date.now(), 0))));
+    }
+}
+
 /**
  * Searches for titles by query string.
  */
-export async function searchTitles(query: string) {
-    const response = await fetch(`${API_BASE_URL}/search?query=${encodeURIComponent(query)}`);
+export async function searchTitles(query: string, fields?: FieldProjection) {
+    let url = `${API_BASE_URL}/search?query=${encodeURIComponent(query)}`;
+    if (fields) url += `&fields=${encodeURIComponent(fields)}`;
+
+    const response = await fetch(url);
     if (!response.ok) throw new Error('Failed to search titles');
     return response.json();
 }
 
 /**
- * Gets AI recommendations based on a title name.
+ * Gets AI recommendations based on a title name. With `hybrid`, titles that
+ * users engage with together are blended into the content similarity.
  */
-export async function getRecommendations(name: string, category?: string) {
-    let url = `${API_BASE_URL}/recommend/${encodeURIComponent(name)}`;
-    if (category) url += `?category=${encodeURIComponent(category)}`;
+export async function getRecommendations(name: string, category?: string, hybrid: boolean = false) {
+    const params = new URLSearchParams();
+    if (category) params.set('category', category);
+    if (hybrid) params.set('hybrid', 'true');
+    const query = params.toString();
+    const url = `${API_BASE_URL}/recommend/${encodeURIComponent(name)}${query ? `?${query}` : ''}`;
 
     const response = await fetch(url);
     if (!response.ok) throw new Error('Failed to get recommendations');
     return response.json();
 }
 
+/**
+ * Anonymous per-browser session id used to group feedback events.
+ */
+function getSessionId() {
+    const key = 'watchify-session';
+    let id = window.localStorage.getItem(key);
+    if (!id) {
+        id = Math.random().toString(36).slice(2) + Date.now().toString(36);
+        window.localStorage.setItem(key, id);
+    }
+    return id;
+}
+
+/**
+ * Reports that the user viewed or clicked a title. Fire-and-forget: feedback
+ * must never break the UI.
+ */
+export function sendFeedback(titleId: number, type: 'view' | 'click' = 'click') {
+    fetch(`${API_BASE_URL}/events`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ user: getSessionId(), title_id: titleId, type }),
+        keepalive: true,
+    }).catch(() => undefined);
+}
+
 /**
  * Utility to resolve local poster paths to full API URLs.
  */
-export function getPosterUrl(path: string) {
+export function getPosterUrl(path: string | null) {
     if (!path || path === 'None') return 'https://via.placeholder.com/500x750?text=No+Poster';
 
     // Convert Windows backslashes to forward slashes
@@ -1,12 +1,76 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, Field
 from recommender import MovieRecommender
-import pandas as pd
+from compute import ComputePool, PoolSaturated
+from cooccurrence import MAX_CLOCK_SKEW, MAX_EVENT_AGE, FeedbackAggregator
+import metrics
+import asyncio
+import base64
+import json
 import os
-from typing import Optional
+import time
+from typing import List, Literal, Optional, Union
 
-app = FastAPI(title="Watchify API", description="Premium Movie, TV Show, and Anime Recommendation Engine")
+# Initialize recommender without building the model yet: the heavy imports and
+# fitting happen in the background once the server is already accepting connections.
+recommender = MovieRecommender.from_env(autoload=False)
+
+# CPU-bound scoring runs on its own bounded worker pool (see compute.py)
+compute_pool = ComputePool.from_env()
+compute_pool.attach(recommender)
+
+# Implicit feedback (views/clicks) aggregated into item-item co-occurrences,
+# used by hybrid recommendations
+feedback = FeedbackAggregator.from_env()
+recommender.cooccurrence = feedback.model
+
+# Seconds between checks of the catalog store's change log (0 disables syncing)
+SYNC_INTERVAL = float(os.environ.get("WATCHIFY_SYNC_INTERVAL", 5))
+
+async def _load_model():
+    """Builds (or restores from cache) the model off the event loop."""
+    await run_in_threadpool(recommender.load_data)
+    compute_pool.model_changed()
+
+async def _restore_feedback():
+    """Restores the co-occurrence model from its checkpoint and the event log."""
+    replayed = await run_in_threadpool(feedback.restore)
+    recommender.cooccurrence = feedback.model
+    if replayed:
+        print(f"Replayed {replayed} feedback events")
+
+async def _sync_model():
+    """Picks up catalog changes written by the scrapers and scripts while the API runs."""
+    while True:
+        await asyncio.sleep(SYNC_INTERVAL)
+        try:
+            if await run_in_threadpool(recommender.sync):
+                compute_pool.model_changed()
+        except Exception as e:
+            print(f"Catalog sync failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app):
+    tasks = [asyncio.create_task(_load_model()), asyncio.create_task(_restore_feedback())]
+    if SYNC_INTERVAL > 0:
+        tasks.append(asyncio.create_task(_sync_model()))
+    yield
+    for task in tasks:
+        task.cancel()
+    compute_pool.shutdown()
+    feedback.checkpoint()
+
+app = FastAPI(
+    title="Watchify API",
+    description="Premium Movie, TV Show, and Anime Recommendation Engine",
+    lifespan=lifespan,
+)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -15,6 +79,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the frontend read the 503 retry hint while the model loads
+    expose_headers=["Retry-After"],
 )
 
 # Serve movie posters as static files with caching
@@ -30,10 +96,99 @@ async def add_cache_headers(request, call_next):
     # Cache poster images for 1 week (604800 seconds)
     if request.url.path.startswith("/posters/"):
         response.headers["Cache-Control"] = "public, max-age=604800, immutable"
+        metrics.record_cache("poster", response.status_code == 304)
+    return response
+
+def _route_template(request):
+    """Resolves the route path template (e.g. /recommend/{name}) to keep metric labels bounded."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+# Record latency/in-flight metrics and expose per-phase Server-Timing headers
+@app.middleware("http")
+async def track_requests(request, call_next):
+    route = _route_template(request)
+    timing = metrics.ServerTiming()
+    token = metrics.current_timing.set(timing)
+    in_flight = metrics.REQUESTS_IN_FLIGHT.labels(route)
+    in_flight.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        in_flight.dec()
+        metrics.current_timing.reset(token)
+        metrics.REQUEST_LATENCY.labels(request.method, route, status).observe(elapsed)
+    timing.add("total", elapsed)
+    response.headers["Server-Timing"] = timing.header()
     return response
 
-# Initialize recommender
-recommender = MovieRecommender()
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+def _require_model():
+    """Rejects requests with 503 until the model has finished loading."""
+    if recommender.movies is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model is {recommender.state}",
+            headers={"Retry-After": "1"},
+        )
+
+def _resolve_fields(fields):
+    """Validates the `fields=` projection parameter (full, card, or a list of columns)."""
+    try:
+        return recommender.resolve_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def facet_filters(
+    category: Optional[str] = None,
+    genre: Optional[str] = Query(None, description="Comma-separated genres; titles must have all of them"),
+    year_min: Optional[int] = None,
+    year_max: Optional[int] = None,
+    rating_min: Optional[float] = Query(None, description="Minimum score on a 0-100 scale"),
+    rating_max: Optional[float] = Query(None, description="Maximum score on a 0-100 scale"),
+):
+    """Facet filters shared by /titles, /search and /recommend (evaluated on the bitmap index)."""
+    return {
+        "category": category,
+        "genres": genre,
+        "year_min": year_min,
+        "year_max": year_max,
+        "rating_min": rating_min,
+        "rating_max": rating_max,
+    }
+
+def _json_response(body):
+    """Wraps pre-serialized JSON bytes, skipping FastAPI's re-encoding."""
+    return Response(content=body, media_type="application/json")
+
+def _encode_cursor(after_id, generation):
+    """Opaque keyset cursor: the last title ID returned and the model generation it came from."""
+    raw = json.dumps({"after": int(after_id), "gen": generation}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+def _decode_cursor(cursor):
+    """Returns (after_id, generation) for a cursor; an empty cursor starts from the beginning."""
+    if not cursor:
+        return 0, recommender.generation
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return int(state["after"]), int(state["gen"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @app.get("/")
 def read_root():
@@ -43,123 +198,206 @@ def read_root():
         "categories": ["Movie", "TV Show", "Anime"]
     }
 
+@app.get("/healthz", include_in_schema=False)
+def healthz():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "alive"}
+
+@app.get("/readyz", include_in_schema=False)
+def readyz():
+    """Readiness probe: 200 once the model is loaded, 503 while loading or after a failure."""
+    body = {"status": recommender.state, "generation": recommender.generation}
+    if recommender.state != "ready":
+        if recommender.last_error:
+            body["error"] = recommender.last_error
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/titles")
 def get_titles(
-    category: Optional[str] = None, 
     page: int = 1, 
-    limit: int = 20
+    limit: int = 20,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous page (empty to start)"),
+    filters: dict = Depends(facet_filters)
 ):
-    """Returns a paginated list of titles, optionally filtered by category."""
-    if not os.path.exists('movies_data.csv'):
-        return {"titles": [], "total": 0}
-    
-    df = pd.read_csv('movies_data.csv')
-    df = df.fillna('None')
+    """
+    Returns a paginated list of titles, optionally filtered by category, genre, year and rating.
+    With `cursor`, pages are keyed on title ID instead of an offset, so titles
+    added or removed by a reload never shift or repeat the rest of a walk.
+    """
+    _require_model()
+    projection = _resolve_fields(fields)
+    if cursor is not None:
+        if not recommender.stable_ids:
+            raise HTTPException(status_code=400, detail="Cursor pagination requires the catalog store (WATCHIFY_DB_PATH)")
+        if limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be at least 1")
+        after_id, cursor_generation = _decode_cursor(cursor)
+        generation = recommender.generation
+        positions, last_id = recommender.page_after(after_id, limit, **filters)
+        next_cursor = _encode_cursor(last_id, generation) if last_id is not None else None
+        titles = recommender.render(positions, projection)
+        return _json_response(
+            b'{"titles":' + titles + b',"next_cursor":%s,"limit":%d,"generation":%d,"catalog_changed":%s}' % (
+                json.dumps(next_cursor).encode(), limit, generation,
+                b'true' if cursor_generation != generation else b'false')
+        )
     
-    # Filter by category if provided
-    if category:
-        df = df[df['Category'].str.lower() == category.lower()]
+    indices = recommender.filter_indices(**filters)
     
-    total = len(df)
+    total = len(indices)
     start = (page - 1) * limit
     end = start + limit
     
-    titles_list = df.iloc[start:end].to_dict(orient='records')
-    return {
-        "titles": titles_list,
-        "total": total,
-        "page": page,
-        "limit": limit
-    }
+    page_indices = indices[start:end]
+    titles = recommender.render(page_indices, projection)
+    # Offset pages hand out a cursor too, so clients can switch to keyset paging
+    next_cursor = None
+    if page_indices and end < total and recommender.stable_ids:
+        next_cursor = _encode_cursor(recommender.ids[page_indices[-1]], recommender.generation)
+    return _json_response(
+        b'{"titles":' + titles + b',"total":%d,"page":%d,"limit":%d,"next_cursor":%s}' % (
+            total, page, limit, json.dumps(next_cursor).encode())
+    )
+
+@app.get("/export.ndjson")
+def export_titles(
+    fields: Optional[str] = None,
+    chunk_size: int = Query(500, ge=1, le=10000),
+    filters: dict = Depends(facet_filters)
+):
+    """
+    Streams every title matching the filters as NDJSON (one JSON object per
+    line, in ID order), so a full-catalog sync is a single request. The records
+    come from one model generation, reported in the X-Watchify-Generation header.
+    """
+    _require_model()
+    projection = _resolve_fields(fields)
+    generation, chunks = recommender.iter_export(projection, chunk_size, **filters)
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"X-Watchify-Generation": str(generation)},
+    )
+
+def _etag_matches(request, etag):
+    """True if the request's If-None-Match lists `etag` (weak or strong) or '*'."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+@app.get("/home")
+def get_home(
+    request: Request,
+    trending: int = Query(12, ge=0, le=50),
+    movies: int = Query(12, ge=0, le=50),
+    tv_shows: int = Query(12, ge=0, le=50),
+    anime: int = Query(12, ge=0, le=50),
+):
+    """
+    Returns every landing-page rail (trending, movies, TV shows, anime) in one
+    response, precomputed per model generation. Clients revalidate with
+    If-None-Match and get a 304 until the rails change.
+    """
+    _require_model()
+    body, etag = recommender.home(trending=trending, movies=movies, tv_shows=tv_shows, anime=anime)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    not_modified = _etag_matches(request, etag)
+    metrics.record_cache("home_etag", not_modified)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/trending")
-def get_trending(count: int = 10):
-    """Returns the latest/highest rated titles across all categories."""
-    if recommender.movies is None:
-        recommender.load_data()
-    return recommender.get_trending(count)
+def get_trending(count: int = 10, category: Optional[str] = None, fields: Optional[str] = None):
+    """Returns the highest rated recent titles, across all categories or for one category."""
+    _require_model()
+    projection = _resolve_fields(fields)
+    # The ranking is precomputed at load time, so this is a plain slice
+    indices = recommender.trending_indices(count, category)
+    return _json_response(recommender.render(indices, projection))
 
 @app.get("/search")
-def search_titles(query: str):
-    """Searches for titles by name, genre, or actors with fuzzy matching."""
+async def search_titles(
+    query: str,
+    fields: Optional[str] = None,
+    filters: dict = Depends(facet_filters)
+):
+    """Searches for titles by name, genre, or actors with fuzzy matching, within the facet filters."""
     # Validate query length
     if len(query.strip()) < 2:
         return []
     
     # Use cached data from recommender instead of reading CSV every time
-    if recommender.movies is None:
-        recommender.load_data()
-    
-    df = recommender.movies.copy()
-    query_lower = query.lower().strip()
-    
-    # Split query into words for better matching
-    query_words = query_lower.split()
-    
-    def calculate_relevance(row):
-        """Calculate relevance score for ranking results"""
-        score = 0
-        name_lower = str(row['Name']).lower()
-        genres_lower = str(row['Genres']).lower()
-        actors_lower = str(row['Actors']).lower()
-        
-        # Exact match in name (highest priority)
-        if query_lower in name_lower:
-            score += 100
-        
-        # Name starts with query
-        if name_lower.startswith(query_lower):
-            score += 50
-        
-        # All query words found in name
-        if all(word in name_lower for word in query_words):
-            score += 30
-        
-        # Match in genres
-        if query_lower in genres_lower:
-            score += 20
-        
-        # Match in actors
-        if query_lower in actors_lower:
-            score += 15
-        
-        # Partial word matches in name (e.g., "spider" matches "Spider-Man")
-        name_words = name_lower.replace('-', ' ').replace(':', ' ').split()
-        for query_word in query_words:
-            for name_word in name_words:
-                if name_word.startswith(query_word):
-                    score += 10
-        
-        return score
-    
-    # Calculate relevance scores
-    df['relevance'] = df.apply(calculate_relevance, axis=1)
-    
-    # Filter results with score > 0
-    results = df[df['relevance'] > 0].sort_values('relevance', ascending=False)
+    _require_model()
+    projection = _resolve_fields(fields)
     
-    # Drop the relevance column before returning
-    results = results.drop('relevance', axis=1)
-    
-    return results.head(12).to_dict(orient='records')
+    indices = await compute_pool.run('search_indices', query, **filters)
+    return _json_response(recommender.render(indices, projection))
 
 @app.get("/recommend/{name}")
-def get_recommendations(
+async def get_recommendations(
     name: str, 
     num: int = 6, 
-    category: Optional[str] = None
+    fields: Optional[str] = None,
+    hybrid: bool = Query(False, description="Blend in titles users engage with together"),
+    filters: dict = Depends(facet_filters)
 ):
-    """Gets AI-powered recommendations for a given title, optionally filtered by category."""
-    if recommender.movies is None:
-        recommender.load_data()
-        
-    recs = recommender.get_recommendations(name, num_recommendations=num, category=category)
-    return recs
+    """Gets AI-powered recommendations for a given title, optionally filtered by category, genre, year and rating."""
+    _require_model()
+    projection = _resolve_fields(fields)
+
+    # Co-occurrences live in this process, so they're looked up here and sent along
+    neighbours = recommender.feedback_neighbours(name) if hybrid else None
+    indices = await compute_pool.run('recommend_indices', name, num_recommendations=num, neighbours=neighbours, **filters)
+    return _json_response(recommender.render(indices, projection))
+
+class FeedbackEvent(BaseModel):
+    """One implicit-feedback event: a user (or anonymous session) viewed or clicked a title."""
+    user: str = Field(..., min_length=1, max_length=128)
+    title_id: int
+    type: Literal['view', 'click'] = 'view'
+    ts: Optional[float] = Field(None, description="Unix time; defaults to the time of receipt")
+
+@app.post("/events", status_code=202)
+def ingest_events(events: Union[FeedbackEvent, List[FeedbackEvent]]):
+    """
+    Ingests one event or a batch: appended to the event log and folded into the
+    co-occurrence model incrementally. Events for unknown titles, or with a
+    timestamp more than MAX_EVENT_AGE old or MAX_CLOCK_SKEW ahead, are dropped.
+    """
+    _require_model()
+    if not recommender.stable_ids:
+        # Events and checkpoints are keyed by ID, which a CSV edit would reassign
+        raise HTTPException(status_code=400, detail="Feedback requires the catalog store (WATCHIFY_DB_PATH)")
+    if not feedback.restored.is_set():
+        raise HTTPException(status_code=503, detail="Feedback model is loading", headers={"Retry-After": "1"})
+    if isinstance(events, FeedbackEvent):
+        events = [events]
+    now = time.time()
+    known = recommender.id_index
+    accepted = [
+        {"user": e.user, "title_id": e.title_id, "type": e.type, "ts": now if e.ts is None else min(e.ts, now)}
+        for e in events
+        if e.title_id in known and (e.ts is None or now - MAX_EVENT_AGE <= e.ts <= now + MAX_CLOCK_SKEW)
+    ]
+    feedback.ingest(accepted)
+    return {"accepted": len(accepted), "rejected": len(events) - len(accepted)}
 
 @app.get("/refresh")
 def refresh_data():
-    """Forces the recommender to reload the CSV data."""
+    """Forces the recommender to reload the catalog."""
     success = recommender.load_data()
+    if success:
+        compute_pool.model_changed()
     return {"status": "success" if success else "failed"}
 
 if __name__ == "__main__":
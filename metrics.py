@@ -0,0 +1,114 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+def render():
+    """Renders every registered metric in the Prometheus text exposition format."""
+    return generate_latest()
+
+
+# --- Metric definitions -------------------------------------------------------
+
+# Most API responses are served from precomputed payloads in well under 5ms,
+# below the client library's smallest default bucket
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "watchify_http_request_duration_seconds",
+    "Latency of HTTP requests by route template.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "watchify_http_requests_in_flight",
+    "Requests currently being handled, by route template.",
+    ["route"],
+)
+CACHE_REQUESTS = Counter(
+    "watchify_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss); hit ratio = hit / (hit + miss).",
+    ["cache", "result"],
+)
+CATALOG_SIZE = Gauge(
+    "watchify_catalog_titles",
+    "Number of titles in the loaded catalog, by category.",
+    ["category"],
+)
+MODEL_GENERATION = Gauge(
+    "watchify_model_generation",
+    "Incremented every time the recommendation model is (re)built successfully.",
+)
+MODEL_BUILD_SECONDS = Histogram(
+    "watchify_model_build_phase_seconds",
+    "Duration of each load_data phase (catalog_read, clean, tag_build, vectorize, similarity or embedding, ...).",
+    ["phase"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+POOL_QUEUE_WAIT = Histogram(
+    "watchify_compute_queue_wait_seconds",
+    "Time CPU-bound calls spend queued before a compute worker picks them up.",
+    buckets=LATENCY_BUCKETS,
+)
+POOL_PENDING = Gauge(
+    "watchify_compute_pending",
+    "Calls admitted to the compute pool (running or queued).",
+)
+POOL_REJECTED = Counter(
+    "watchify_compute_rejected_total",
+    "Calls rejected with 503 because the compute queue was full.",
+)
+
+FEEDBACK_EVENTS = Counter(
+    "watchify_feedback_events_total",
+    "Implicit-feedback events ingested, by event type.",
+    ["type"],
+)
+COOCCURRENCE_ENTRIES = Gauge(
+    "watchify_cooccurrence_entries",
+    "Item-item pairs held by the co-occurrence model (bounded by top-K pruning).",
+)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+# --- Server-Timing ------------------------------------------------------------
+
+class ServerTiming:
+    """
+    Collects the named phases of a single request so they can be returned
+    to the client in a `Server-Timing` header.
+    """
+    def __init__(self):
+        self.entries = []
+
+    def add(self, name, seconds):
+        self.entries.append((name, seconds))
+
+    def header(self):
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.entries)
+
+
+current_timing = ContextVar("current_timing", default=None)
+
+
+@contextmanager
+def timed(phase):
+    """
+    Times a block as a Server-Timing phase of the current request.
+    Outside of a request (e.g. scripts) this is a no-op timer.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing = current_timing.get()
+        if timing is not None:
+            timing.add(phase, time.perf_counter() - start)
@@ -1,118 +1,726 @@
-import pandas as pd
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import hashlib
+import json
 import os
+import pickle
+import re
+import threading
+import metrics
+
+# Bump whenever the structure of the built model changes, so stale
+# artifacts in the cache directory are rebuilt instead of loaded.
+MODEL_VERSION = 4
+
+# Fields the grid cards need; `fields=card` responses carry only these.
+CARD_FIELDS = ['ID', 'Name', 'Year', 'Rating', 'Genres', 'Poster_Path', 'Category']
+
+
+# Landing-page rails served by /home: (response key, category or None for
+# trending, projection). Trending is full because the hero shows plots.
+HOME_RAILS = [
+    ('trending', None, 'full'),
+    ('movies', 'Movie', 'card'),
+    ('tv_shows', 'TV Show', 'card'),
+    ('anime', 'Anime', 'card'),
+]
+HOME_CACHE_SIZE = 32
+
+# Trending blends rating with recency; titles without a rating are scored
+# with the mean rating of their category so they aren't buried.
+TRENDING_RATING_WEIGHT = 0.6
+TRENDING_HALF_LIFE_YEARS = 10
+
+
+def parse_rating(rating):
+    """
+    Converts a scraped rating to a 0-100 score, or None if it can't be parsed.
+    Cinematerial ratings look like '94 / 100'; Anime-Planet uses 5 stars ('4.4').
+    """
+    if rating is None:
+        return None
+    match = re.match(r'\s*(\d+(?:\.\d+)?)\s*(?:/\s*(\d+(?:\.\d+)?))?', str(rating))
+    if not match:
+        return None
+    value = float(match.group(1))
+    if match.group(2):
+        scale = float(match.group(2))
+    else:
+        scale = 5.0 if value <= 5 else 10.0 if value <= 10 else 100.0
+    return round(value / scale * 100, 1) if scale else None
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
 
 class MovieRecommender:
     """
     Watchify Recommendation Engine
     This class handles the core logic for suggesting Movies, TV Shows, and Anime.
     It uses 'Content-Based Filtering' based on plot, genres, and cast.
+
+    Two scoring modes are available:
+    - 'bow' (default): cosine similarity of bag-of-words vectors, precomputed
+      into an N x N similarity matrix.
+    - 'lsa': dense `lsa_dim`-dimensional LSA embeddings (see embeddings.py),
+      stored as float32 or int8 and scored on the fly.
+
+    Recommendations can also be hybrid: content similarity blended with what
+    users engage with together (see cooccurrence.py), weighted by `hybrid_weight`.
     """
-    def __init__(self, csv_path='movies_data.csv'):
+    def __init__(self, csv_path='movies_data.csv', cache_dir='.watchify_cache', autoload=True,
+                 mode='bow', lsa_dim=128, lsa_dtype='float32', db_path='watchify.db', hybrid_weight=0.3):
+        if mode not in ('bow', 'lsa'):
+            raise ValueError(f"Unknown recommender mode: {mode}")
         self.csv_path = csv_path
+        self.db_path = db_path
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.lsa_dim = lsa_dim
+        self.lsa_dtype = lsa_dtype
+        self.hybrid_weight = hybrid_weight
+        # Optional CooccurrenceModel used by hybrid recommendations; attached by the API
+        self.cooccurrence = None
         self.movies = None
         self.similarity_matrix = None
-        self.load_data()
+        self.embeddings = None
+        self.records = []
+        self.payloads = {}
+        self.trending = {}
+        self.facets = None
+        self.name_index = {}
+        self.id_index = {}
+        self.ids = None
+        self.home_cache = {}
+        self.generation = 0
+        self.source_version = None
+        self.loading = False
+        self.last_error = None
+        self._load_lock = threading.Lock()
+        if autoload:
+            self.load_data()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Builds a recommender configured by WATCHIFY_MODEL_MODE / WATCHIFY_LSA_* variables."""
+        return cls(
+            mode=os.environ.get("WATCHIFY_MODEL_MODE", "bow"),
+            lsa_dim=int(os.environ.get("WATCHIFY_LSA_DIM", 128)),
+            lsa_dtype=os.environ.get("WATCHIFY_LSA_DTYPE", "float32"),
+            db_path=os.environ.get("WATCHIFY_DB_PATH", "watchify.db") or None,
+            hybrid_weight=float(os.environ.get("WATCHIFY_HYBRID_WEIGHT", 0.3)),
+            **kwargs,
+        )
+
+    def __getstate__(self):
+        # Locks can't be pickled (e.g. when handing the model to worker processes).
+        # Co-occurrences keep changing in the API process, so workers receive
+        # them per call instead (see recommend_indices).
+        state = self.__dict__.copy()
+        del state['_load_lock']
+        state['cooccurrence'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load_lock = threading.Lock()
+
+    @property
+    def state(self):
+        """Readiness of the model: 'ready', 'loading', 'failed' or 'idle'."""
+        if self.movies is not None:
+            return 'ready'
+        if self.loading:
+            return 'loading'
+        return 'failed' if self.last_error else 'idle'
 
     def load_data(self):
         """
-        Loads the dataset and prepares the mathematical model for recommendations.
+        Loads the catalog and prepares the mathematical model for recommendations.
+        The catalog is read from the SQLite catalog store (created from the CSV on
+        first use), or straight from the CSV when `db_path` is None.
+        A previously built model is reused from the cache directory when the
+        catalog hasn't changed since it was saved.
         """
-        if not os.path.exists(self.csv_path):
+        if not self.db_path and not os.path.exists(self.csv_path):
             print(f"Warning: {self.csv_path} not found.")
+            self.last_error = f"{self.csv_path} not found"
             return False
-        
+
+        with self._load_lock:
+            self.loading = True
+            try:
+                # The version is read once, before any data: a write landing after
+                # it is then newer than the model and picked up by the next sync()
+                version = self._source_version()
+                model = self._load_artifacts(self._fingerprint(version))
+                metrics.record_cache("model_artifacts", model is not None)
+                if model is None:
+                    movies, version = self._read_catalog()
+                    model = self._build_model(movies)
+                    self._save_artifacts(self._fingerprint(version), model)
+                self._install(*model, version)
+                self.last_error = None
+                return True
+            except Exception as e:
+                print(f"Error loading data: {e}")
+                self.last_error = str(e)
+                return False
+            finally:
+                self.loading = False
+
+    def sync(self):
+        """
+        Brings the model up to date with its catalog and returns True if it changed.
+        With a catalog store, the change log is tailed from the last loaded change:
+        edits that don't touch the tag columns (posters, ratings, years, ...) are
+        patched into the loaded model without refitting it, while inserts, deletes
+        and content edits trigger a full rebuild. A CSV catalog is rebuilt whenever
+        the file changes.
+        """
+        if self.movies is None or self.loading:
+            return False
+        if not self.db_path:
+            if not os.path.exists(self.csv_path) or self._source_version() == self.source_version:
+                return False
+            return self.load_data()
+
+        from catalog_store import CatalogStore
+        with CatalogStore(self.db_path) as store:
+            changes = store.changes_since(self.source_version)
+            if not changes:
+                return False
+            if any(op != 'update_meta' for _, _, op in changes):
+                return self.load_data()
+            rows = store.get({title_id for _, title_id, _ in changes})
+        version = changes[-1][0]
+
+        with self._load_lock:
+            try:
+                movies = self._patch_catalog(self.movies, rows)
+                model = (movies, self.similarity_matrix, self.embeddings)
+                self._save_artifacts(self._fingerprint(version), model)
+                self._install(*model, version)
+                return True
+            except Exception as e:
+                print(f"Error syncing catalog: {e}")
+                return False
+
+    def _install(self, movies, similarity_matrix, embeddings, version):
+        """Derives the serving structures from a built model and swaps them all in."""
+        with metrics.MODEL_BUILD_SECONDS.labels('serialize').time():
+            records, payloads = self._serialize(movies)
+        with metrics.MODEL_BUILD_SECONDS.labels('trending').time():
+            trending = self._rank_trending(movies)
+        with metrics.MODEL_BUILD_SECONDS.labels('facets').time():
+            from facets import FacetIndex
+            facets = FacetIndex(movies)
+            # Lowercased name -> first catalog position, for title lookups
+            name_index = {}
+            for position, name in enumerate(movies['Name'].fillna('').str.lower()):
+                name_index.setdefault(name, position)
+            # The catalog is kept in ID order, so IDs double as a sorted keyset for pagination
+            ids = movies['ID'].to_numpy(dtype='int64')
+            id_index = {int(title_id): position for position, title_id in enumerate(ids)}
+
+        # Swap the new model in only once it is fully built, so readers never
+        # see a catalog that doesn't match its similarity matrix.
+        self.movies, self.similarity_matrix, self.embeddings = movies, similarity_matrix, embeddings
+        self.records, self.payloads, self.trending = records, payloads, trending
+        self.facets, self.name_index, self.id_index, self.ids = facets, name_index, id_index, ids
+        self.home_cache = {}
+        self.source_version = version
+        self.generation += 1
+        self._publish_metrics()
+
+    def _source_version(self):
+        """Last change sequence number of the catalog store, or the CSV's size and mtime."""
+        if self.db_path:
+            from catalog_store import open_catalog
+            with open_catalog(self.db_path, self.csv_path) as store:
+                return store.last_change()
+        stat = os.stat(self.csv_path)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _fingerprint(self, version):
+        settings = (self.mode, self.lsa_dim, self.lsa_dtype) if self.mode == 'lsa' else (self.mode,)
+        source = os.path.abspath(self.db_path or self.csv_path)
+        return (MODEL_VERSION, settings, source, version)
+
+    def _read_catalog(self):
+        """
+        Reads the raw catalog as text columns plus an integer ID, along with the
+        source version it corresponds to: the store's change sequence read in the
+        same transaction, or the CSV's stat taken before reading it (so a write
+        during the read shows up as a newer version). CSV rows are numbered from 1.
+        """
+        import pandas as pd
+
+        with metrics.MODEL_BUILD_SECONDS.labels('catalog_read').time():
+            if self.db_path:
+                from catalog_store import open_catalog
+                with open_catalog(self.db_path, self.csv_path) as store:
+                    return store.load_snapshot()
+            version = self._source_version()
+            movies = pd.read_csv(self.csv_path, dtype=str, keep_default_na=False)
+            movies.insert(0, 'ID', range(1, len(movies) + 1))
+            return movies, version
+
+    @staticmethod
+    def _clean_catalog(movies):
+        """
+        Blanks and legacy 'None'/'nan'/'Unknown' sentinels become real nulls, then
+        Year and Rating get proper numeric types (Rating is kept for display, Score is 0-100).
+        """
+        import pandas as pd
+
+        ids = movies['ID'].astype('int64')
+        movies = movies.drop(columns='ID').astype(object).replace(['', 'None', 'nan', 'NaN', 'Unknown'], None)
+        movies.insert(0, 'ID', ids)
+        if 'Year' in movies.columns:
+            movies['Year'] = pd.to_numeric(movies['Year'], errors='coerce').astype('Int64')
+        if 'Rating' in movies.columns:
+            movies['Score'] = pd.array([parse_rating(r) for r in movies['Rating']], dtype='Float64')
+        return movies
+
+    def _patch_catalog(self, movies, rows):
+        """
+        Returns a copy of the catalog with the non-tag columns of the given
+        {ID: record} rows replaced. The tags (and so the vectors) are unchanged.
+        """
+        import pandas as pd
+
+        from catalog_store import CONTENT_COLUMNS
+
+        patch = self._clean_catalog(pd.DataFrame(list(rows.values())))
+        positions = pd.Index(movies['ID']).get_indexer(patch['ID'])
+        found = positions >= 0
+        patch, positions = patch[found], positions[found]
+        movies = movies.copy()
+        for column in patch.columns:
+            if column in movies.columns and column != 'ID' and column not in CONTENT_COLUMNS:
+                movies.iloc[positions, movies.columns.get_loc(column)] = patch[column].to_numpy()
+        return movies
+
+    def _artifact_path(self):
+        return os.path.join(self.cache_dir, f'model-{self.mode}.pkl')
+
+    def _load_artifacts(self, fingerprint):
+        """Returns the cached (movies, similarity_matrix, embeddings) if it matches the catalog, else None."""
+        if not self.cache_dir or not os.path.exists(self._artifact_path()):
+            return None
+        path = self._artifact_path()
         try:
-            # 1. Load the dataset
-            self.movies = pd.read_csv(self.csv_path)
-            
-            # 2. Data Cleaning: Fill missing values with 'None' to prevent errors
-            self.movies = self.movies.fillna('None')
-            
-            # Ensure character columns are strings and handle any rogue 'nan' strings
-            for col in ['Name', 'Genres', 'Actors', 'Plot', 'Rating', 'Year', 'Poster_Path', 'Category']:
-                if col in self.movies.columns:
-                    self.movies[col] = self.movies[col].astype(str).replace('nan', 'None')
-            
-            # 3. Feature Engineering: Create 'tags' for comparison
-            # We combine the most important text features into a single string.
-            # This allows the model to find similarities across multiple dimensions at once.
-            if 'Category' not in self.movies.columns:
-                self.movies['Category'] = 'Movie' # Default fallback
+            with metrics.MODEL_BUILD_SECONDS.labels('artifact_load').time():
+                with open(path, 'rb') as f:
+                    cached = pickle.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable model cache {path}: {e}")
+            return None
+        if cached.get('fingerprint') != fingerprint:
+            return None
+        return cached['model']
+
+    def _save_artifacts(self, fingerprint, model):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._artifact_path() + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'fingerprint': fingerprint, 'model': model}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._artifact_path())
+        except OSError as e:
+            print(f"Could not write model cache: {e}")
+
+    def _build_model(self, movies):
+        """
+        Builds the catalog DataFrame and, depending on the mode, its similarity
+        matrix or its LSA embeddings from the raw catalog.
+        Heavy libraries are imported here, so importing this module stays cheap.
+        """
+        from sklearn.feature_extraction.text import CountVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        phase = metrics.MODEL_BUILD_SECONDS.labels
+
+        # 1-2. Data Cleaning: real nulls and typed Year/Score columns
+        with phase('clean').time():
+            movies = self._clean_catalog(movies)
+        
+        # 3. Feature Engineering: Create 'tags' for comparison
+        # We combine the most important text features into a single string.
+        # This allows the model to find similarities across multiple dimensions at once.
+        with phase('tag_build').time():
+            if 'Category' not in movies.columns:
+                movies['Category'] = None
+            movies['Category'] = movies['Category'].fillna('Movie') # Default fallback
                 
-            self.movies['tags'] = (
-                self.movies['Name'] + " " + 
-                self.movies['Genres'] + " " + 
-                self.movies['Actors'] + " " + 
-                self.movies['Plot'] + " " +
-                self.movies['Category']
+            text = movies[['Name', 'Genres', 'Actors', 'Plot']].fillna('')
+            movies['tags'] = (
+                text['Name'] + " " + 
+                text['Genres'] + " " + 
+                text['Actors'] + " " + 
+                text['Plot'] + " " +
+                movies['Category']
             ).str.lower()
-            
-            # 4. Vectorization: Converting text into numbers
-            # CountVectorizer counts the frequency of words in the 'tags' column.
-            # We limit to 5000 features (top words) and remove common English 'stop words' (like 'the', 'is').
+        
+        # 4. Vectorization: Converting text into numbers
+        # CountVectorizer counts the frequency of words in the 'tags' column.
+        # We limit to 5000 features (top words) and remove common English 'stop words' (like 'the', 'is').
+        with phase('vectorize').time():
             cv = CountVectorizer(max_features=5000, stop_words='english')
-            vectors = cv.fit_transform(self.movies['tags']).toarray()
-            
-            # 5. Cosine Similarity: Calculating the distance between titles
-            # This creates a square matrix where each cell represents the similarity 
-            # score (0 to 1) between two titles. 1 means identical, 0 means completely different.
-            self.similarity_matrix = cosine_similarity(vectors)
-            return True
-        except Exception as e:
-            print(f"Error loading data: {e}")
-            return False
+            vectors = cv.fit_transform(movies['tags'])
+
+        if self.mode == 'lsa':
+            # 5. Embedding: project the sparse counts into a small dense space,
+            # where similarity is computed per request (no N x N matrix is kept)
+            with phase('embedding').time():
+                from embeddings import LSAEmbeddings
+                embeddings = LSAEmbeddings.fit(vectors, dim=self.lsa_dim, dtype=self.lsa_dtype)
+            return movies, None, embeddings
+        
+        # 5. Cosine Similarity: Calculating the distance between titles
+        # This creates a square matrix where each cell represents the similarity 
+        # score (0 to 1) between two titles. 1 means identical, 0 means completely different.
+        with phase('similarity').time():
+            similarity_matrix = cosine_similarity(vectors.toarray())
 
-    def get_recommendations(self, title, num_recommendations=6, category=None):
+        return movies, similarity_matrix, None
+
+    def _publish_metrics(self):
+        """Exports catalog size and model generation to the metrics registry."""
+        metrics.MODEL_GENERATION.set(self.generation)
+        metrics.CATALOG_SIZE.clear()
+        for category, size in self.movies['Category'].value_counts().items():
+            metrics.CATALOG_SIZE.labels(category).set(size)
+        metrics.CATALOG_SIZE.labels('all').set(len(self.movies))
+
+    def _serialize(self, movies):
+        """
+        Serializes every title to JSON once, in a full and a compact 'card'
+        variant, so responses can be assembled by joining bytes.
+        """
+        frame = movies.drop(columns='tags')
+        # Missing values are serialized as JSON null
+        records = frame.astype(object).where(frame.notna(), None).to_dict(orient='records')
+        payloads = {
+            'full': [_dumps(r) for r in records],
+            'card': [_dumps({f: r.get(f) for f in CARD_FIELDS}) for r in records],
+        }
+        return records, payloads
+
+    def _rank_trending(self, movies):
+        """
+        Precomputes the trending order, overall ('all') and per lowercased category,
+        by blending the rating score with recency. /trending is then a list slice.
+        """
+        import numpy as np
+
+        categories = movies['Category'].str.lower()
+        score = movies['Score'].astype('float64') if 'Score' in movies.columns else categories.map(lambda _: np.nan)
+        score = score.fillna(score.groupby(categories).transform('mean')).fillna(score.mean()).fillna(50.0)
+
+        year = movies['Year'].astype('float64') if 'Year' in movies.columns else score * np.nan
+        newest = year.max()
+        # Recency halves for every TRENDING_HALF_LIFE_YEARS before the newest title
+        recency = (0.5 ** ((newest - year) / TRENDING_HALF_LIFE_YEARS)).fillna(0.0)
+
+        blended = TRENDING_RATING_WEIGHT * score / 100 + (1 - TRENDING_RATING_WEIGHT) * recency
+        order = np.argsort(-blended.to_numpy(), kind='stable')
+        category_values = categories.to_numpy()
+        ranking = {'all': order.tolist()}
+        for category in np.unique(category_values):
+            ranking[category] = order[category_values[order] == category].tolist()
+        return ranking
+
+    def resolve_fields(self, fields=None):
+        """
+        Validates a `fields` projection: 'full' (default), 'card', or a
+        comma-separated list of columns. Raises ValueError on unknown columns.
+        """
+        if not fields or fields == 'full':
+            return 'full'
+        if fields == 'card':
+            return 'card'
+        columns = tuple(f.strip() for f in fields.split(',') if f.strip())
+        available = [c for c in self.movies.columns if c != 'tags']
+        unknown = [f for f in columns if f not in available]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return columns
+
+    @property
+    def stable_ids(self):
+        """
+        True when title IDs survive catalog edits (the SQLite store). CSV rows
+        are numbered by position, so inserting or removing one shifts every later ID.
+        """
+        return bool(self.db_path)
+
+    def render(self, indices, fields='full'):
+        """Returns the titles at `indices` as a JSON array (bytes) in the given projection."""
+        with metrics.timed('serialize'):
+            if isinstance(fields, tuple):
+                fragments = [_dumps({f: self.records[i][f] for f in fields}) for i in indices]
+            else:
+                payloads = self.payloads[fields]
+                fragments = [payloads[i] for i in indices]
+            return b'[' + b','.join(fragments) + b']'
+
+    def facet_mask(self, **filters):
+        """
+        Evaluates facet filters (category, genres, year_min/max, rating_min/max)
+        against the bitmap index. Returns None when no filter is set.
+        """
+        if self.facets is None:
+            return None
+        return self.facets.mask(**filters)
+
+    def filter_indices(self, **filters):
+        """Returns catalog row positions matching the facet filters, in catalog order."""
+        if self.movies is None:
+            return []
+        with metrics.timed('lookup'):
+            mask = self.facet_mask(**filters)
+            if mask is None:
+                return list(range(len(self.records)))
+            return mask.nonzero()[0].tolist()
+
+    def page_after(self, after_id=0, limit=20, **filters):
+        """
+        Keyset pagination: the next `limit` titles matching the filters whose ID is
+        greater than `after_id`, in ID order. Returns (positions, last_id), where
+        last_id is the ID to continue after, or None on the last page.
+        Pages are anchored on IDs rather than offsets, so a reload that adds or
+        removes titles never shifts or repeats the rest of a walk.
+        """
+        import numpy as np
+
+        if self.movies is None:
+            return [], None
+        with metrics.timed('lookup'):
+            ids, mask = self.ids, self.facet_mask(**filters)
+            start = int(np.searchsorted(ids, after_id, side='right'))
+            if mask is None:
+                positions = list(range(start, min(start + limit + 1, len(ids))))
+            else:
+                # Scan the bitmap from the keyset position until the page is full
+                positions = []
+                chunk = max(limit * 4, 256)
+                while start < len(ids) and len(positions) <= limit:
+                    positions.extend((mask[start:start + chunk].nonzero()[0] + start).tolist())
+                    start += chunk
+            if len(positions) <= limit:
+                return positions, None
+            return positions[:limit], int(ids[positions[limit - 1]])
+
+    def iter_export(self, fields='full', chunk_size=500, **filters):
+        """
+        Streams the matching titles as NDJSON (one JSON object per line), in ID
+        order, in chunks of up to `chunk_size` records. Returns (generation,
+        chunks): the generator holds on to the model as of this call, so a reload
+        mid-stream can't mix generations, and memory use doesn't grow with the catalog.
+        """
+        generation = self.generation
+        records, payloads, mask = self.records, self.payloads, self.facet_mask(**filters)
+        return generation, self._export_chunks(records, payloads, mask, fields, chunk_size)
+
+    @staticmethod
+    def _export_chunks(records, payloads, mask, fields, chunk_size):
+        for start in range(0, len(records), chunk_size):
+            if mask is None:
+                positions = range(start, min(start + chunk_size, len(records)))
+            else:
+                positions = (mask[start:start + chunk_size].nonzero()[0] + start).tolist()
+            if isinstance(fields, tuple):
+                lines = [_dumps({f: records[i][f] for f in fields}) for i in positions]
+            else:
+                lines = [payloads[fields][i] for i in positions]
+            if lines:
+                yield b'\n'.join(lines) + b'\n'
+
+    def get_recommendations(self, title, num_recommendations=6, category=None, hybrid=False, **filters):
         """
         Retrieves the most similar content based on a given title.
-        Optionally filters results to a specific category (Movie, TV Show, Anime).
+        Optionally filters results to a specific category (Movie, TV Show, Anime)
+        and to any other facet (genres, year_min/max, rating_min/max).
+        With hybrid=True, titles users engage with together are boosted.
         """
-        if self.movies is None or self.similarity_matrix is None:
+        neighbours = self.feedback_neighbours(title) if hybrid else None
+        indices = self.recommend_indices(title, num_recommendations, neighbours=neighbours, category=category, **filters)
+        return [self.records[i] for i in indices]
+
+    def feedback_neighbours(self, title):
+        """Co-occurrence neighbours ({ID: 0-1 score}) of a title, or None without feedback data."""
+        position = self.name_index.get(title.lower())
+        # Feedback is keyed by title ID, which is only meaningful with stable IDs
+        if self.cooccurrence is None or position is None or not self.stable_ids:
+            return None
+        return self.cooccurrence.neighbours_of(self.records[position]['ID'])
+
+    def recommend_indices(self, title, num_recommendations=6, neighbours=None, **filters):
+        """
+        Same as get_recommendations, but returns catalog row positions.
+        `neighbours` ({ID: 0-1 score}, from feedback_neighbours) blends
+        co-occurrence into the content similarity with weight `hybrid_weight`.
+        """
+        import numpy as np
+
+        if self.movies is None or (self.similarity_matrix is None and self.embeddings is None):
             return []
         
         try:
             # Find the index of the title in the dataframe
             # We use lowercase comparison to be more forgiving
-            matches = self.movies[self.movies['Name'].str.lower() == title.lower()]
-            if matches.empty:
-                return []
-                
-            movie_index = matches.index[0]
-            
-            # Get the similarity scores for this specific title
-            distances = self.similarity_matrix[movie_index]
-            
-            # Sort the distance array:
-            # enumerate(distances) gives us (index, score) pairs.
-            # We sort descending by score and skip the first item (since it's the title itself with score 1.0).
-            movie_list = sorted(list(enumerate(distances)), reverse=True, key=lambda x: x[1])[1:50] 
+            with metrics.timed('lookup'):
+                movie_index = self.name_index.get(title.lower())
+                if movie_index is None:
+                    return []
+
+                # Facet filters narrow the candidates before anything is scored
+                mask = self.facet_mask(**filters)
+                if mask is None:
+                    candidates = np.arange(len(self.records))
+                else:
+                    candidates = mask.nonzero()[0]
+                # Never recommend the title itself
+                candidates = candidates[candidates != movie_index]
             
-            # Filter and collect results
-            recommendations = []
-            for i in movie_list:
-                rec_data = self.movies.iloc[i[0]].to_dict()
-                
-                # Apply category filter if requested
-                if category and rec_data['Category'].lower() != category.lower():
-                    continue
-                    
-                recommendations.append(rec_data)
+            with metrics.timed('scoring'):
+                # Similarity scores between this title and every candidate
+                if self.embeddings is not None:
+                    distances = self.embeddings.similarities(movie_index, candidates)
+                else:
+                    distances = self.similarity_matrix[movie_index, candidates]
+
+                if neighbours:
+                    collaborative = np.zeros(len(self.records))
+                    for title_id, score in neighbours.items():
+                        position = self.id_index.get(title_id)
+                        if position is not None:
+                            collaborative[position] = score
+                    distances = (1 - self.hybrid_weight) * distances + self.hybrid_weight * collaborative[candidates]
                 
-                if len(recommendations) >= num_recommendations:
-                    break
+                # Partially sort to find the top scores, then order just those
+                k = min(num_recommendations, len(candidates))
+                if k <= 0:
+                    return []
+                top = np.argpartition(-distances, k - 1)[:k]
+                top = top[np.argsort(-distances[top], kind='stable')]
                     
-            return recommendations
+            return candidates[top].tolist()
         except Exception as e:
             print(f"Prediction Error: {e}")
             return []
 
-    def get_trending(self, count=10):
-        """Returns trending content (simulated using high ratings/latest years)"""
+    def search(self, query, limit=12, **filters):
+        """
+        Searches titles by name, genre, or actors with fuzzy matching,
+        returning the best matches ranked by relevance. Facet filters
+        restrict which titles are scored at all.
+        """
+        return [self.records[i] for i in self.search_indices(query, limit, **filters)]
+
+    def search_indices(self, query, limit=12, **filters):
+        """Same as search, but returns catalog row positions."""
         if self.movies is None: return []
-        # Sort by year (desc) and rating if available
-        return self.movies.sort_values(by=['Year'], ascending=False).head(count).to_dict(orient='records')
+        with metrics.timed('lookup'):
+            df = self.movies[['Name', 'Genres', 'Actors']]
+            mask = self.facet_mask(**filters)
+            if mask is not None:
+                df = df[mask]
+            df = df.fillna('')
+        if df.empty:
+            return []
+        query_lower = query.lower().strip()
+    
+        # Split query into words for better matching
+        query_words = query_lower.split()
+    
+        def calculate_relevance(row):
+            """Calculate relevance score for ranking results"""
+            score = 0
+            name_lower = str(row['Name']).lower()
+            genres_lower = str(row['Genres']).lower()
+            actors_lower = str(row['Actors']).lower()
+        
+            # Exact match in name (highest priority)
+            if query_lower in name_lower:
+                score += 100
+        
+            # Name starts with query
+            if name_lower.startswith(query_lower):
+                score += 50
+        
+            # All query words found in name
+            if all(word in name_lower for word in query_words):
+                score += 30
+        
+            # Match in genres
+            if query_lower in genres_lower:
+                score += 20
+        
+            # Match in actors
+            if query_lower in actors_lower:
+                score += 15
+        
+            # Partial word matches in name (e.g., "spider" matches "Spider-Man")
+            name_words = name_lower.replace('-', ' ').replace(':', ' ').split()
+            for query_word in query_words:
+                for name_word in name_words:
+                    if name_word.startswith(query_word):
+                        score += 10
+        
+            return score
+    
+        # Calculate relevance scores
+        with metrics.timed('scoring'):
+            df['relevance'] = df.apply(calculate_relevance, axis=1)
+        
+            # Filter results with score > 0
+            results = df[df['relevance'] > 0].sort_values('relevance', ascending=False)
+    
+        return results.head(limit).index.tolist()
+
+    def get_trending(self, count=10, category=None):
+        """Returns trending content (ranked by rating and recency), optionally for one category."""
+        return [self.records[i] for i in self.trending_indices(count, category)]
+
+    def trending_indices(self, count=10, category=None):
+        """Same as get_trending, but returns catalog row positions."""
+        with metrics.timed('lookup'):
+            return self.trending.get(category.lower() if category else 'all', [])[:count]
+
+    def home(self, **sizes):
+        """
+        Returns (body, etag) for the landing page: a JSON object with every rail in
+        HOME_RAILS, sized by keyword (e.g. trending=12, anime=6). All rails are
+        rendered from the same model generation, and each combination of sizes is
+        serialized once per generation. The ETag is a hash of the body, so it only
+        changes when the rails do.
+        """
+        generation, cache = self.generation, self.home_cache
+        key = tuple(sizes.get(name, 12) for name, _, _ in HOME_RAILS)
+        cached = cache.get(key)
+        metrics.record_cache("home", cached is not None)
+        if cached is not None:
+            return cached
+
+        parts = []
+        for (name, category, projection), size in zip(HOME_RAILS, key):
+            if category is None:
+                indices = self.trending_indices(size)
+            else:
+                indices = self.filter_indices(category=category)[:size]
+            parts.append(b'"%s":%s' % (name.encode(), self.render(indices, projection)))
+        body = b'{' + b','.join(parts) + b'}'
+        result = (body, '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest())
+
+        # Only cache what was rendered from a single, still-current generation
+        if generation == self.generation:
+            if len(cache) >= HOME_CACHE_SIZE:
+                cache.clear()
+            cache[key] = result
+        return result
 
 if __name__ == "__main__":
     # Test script
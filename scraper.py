@@ -1,10 +1,11 @@
 import requests
 from bs4 import BeautifulSoup
-import pandas as pd
 import time
 import random
 import re
 import os
+from catalog_store import DEFAULT_DB_PATH, open_catalog
+from dedupe import resolve_duplicates
 
 class WatchifyScraper:
     """
@@ -22,6 +23,7 @@ class WatchifyScraper:
         if not os.path.exists(self.posters_dir):
             os.makedirs(self.posters_dir)
         self.csv_path = "movies_data.csv"
+        self.db_path = DEFAULT_DB_PATH
 
     def download_image(self, url, filename):
         """Downloads a poster image to the local posters directory."""
@@ -175,59 +177,57 @@ class WatchifyScraper:
 
     def run_scrape(self, targets={"Movie": 500, "TV Show": 300, "Anime": 200}):
         """Main loop for scraping multiple categories until targets are reached."""
-        all_data = []
-        if os.path.exists(self.csv_path):
-            try:
-                existing_df = pd.read_csv(self.csv_path)
-                all_data = existing_df.to_dict(orient='records')
-                print(f"Loaded {len(all_data)} existing records.")
-            except:
-                print("Could not load existing CSV, starting fresh.")
-
-        for category, target in targets.items():
-            current_count = len([x for x in all_data if x.get('Category') == category])
-            if current_count >= target:
-                print(f"Target for {category} already reached ({current_count}/{target})")
-                continue
-
-            print(f"Scraping category: {category} (Goal: {target})")
-            
-            # Map category to URL paths
-            url_path = "movies" if category == "Movie" else "tv"
-            if category == "Anime":
-                # For anime, we'll try the 'Animation' genre or searching
-                url_path = "movies?genre=Animation"
-            
-            page = 1
-            while current_count < target and page < 100:
-                print(f"  Fetching page {page} for {category}...")
-                links = self.get_links(url_path, page)
-                if not links:
-                    print(f"  No more links found for {category} at page {page}")
-                    break
+        with open_catalog(self.db_path, self.csv_path) as store:
+            seen_urls = store.source_urls()
+            print(f"Loaded {store.count()} existing records.")
+
+            for category, target in targets.items():
+                current_count = store.count(category)
+                if current_count >= target:
+                    print(f"Target for {category} already reached ({current_count}/{target})")
+                    continue
+
+                print(f"Scraping category: {category} (Goal: {target})")
                 
-                for link in links:
-                    # Avoid duplicates
-                    if any(x.get('Source_URL') == link for x in all_data):
-                        continue
-                    
-                    details = self.get_details(link, category)
-                    if details:
-                        all_data.append(details)
-                        current_count += 1
-                        print(f"    [{current_count}/{target}] Added: {details['Name']}")
-                    
-                    if current_count >= target:
+                # Map category to URL paths
+                url_path = "movies" if category == "Movie" else "tv"
+                if category == "Anime":
+                    # For anime, we'll try the 'Animation' genre or searching
+                    url_path = "movies?genre=Animation"
+                
+                page = 1
+                while current_count < target and page < 100:
+                    print(f"  Fetching page {page} for {category}...")
+                    links = self.get_links(url_path, page)
+                    if not links:
+                        print(f"  No more links found for {category} at page {page}")
                         break
+                    
+                    page_data = []
+                    for link in links:
+                        # Avoid duplicates
+                        if link in seen_urls:
+                            continue
                         
-                    # Polite delay
-                    time.sleep(random.uniform(0.1, 0.4))
-                
-                # Save progress after each page
-                pd.DataFrame(all_data).to_csv(self.csv_path, index=False)
-                page += 1
-                
-        print(f"Scraping task complete. Final total: {len(all_data)} items.")
+                        details = self.get_details(link, category)
+                        if details:
+                            page_data.append(details)
+                            seen_urls.add(link)
+                            current_count += 1
+                            print(f"    [{current_count}/{target}] Added: {details['Name']}")
+                        
+                        if current_count >= target:
+                            break
+                            
+                        # Polite delay
+                        time.sleep(random.uniform(0.1, 0.4))
+                    
+                    # Save progress after each page, in a single transaction
+                    store.upsert_many(page_data)
+                    page += 1
+                    
+            resolve_duplicates(store)
+            print(f"Scraping task complete. Final total: {store.count()} items.")
 
 if __name__ == "__main__":
     scraper = WatchifyScraper()
@@ -1,104 +1,308 @@
 
 import os
-import pandas as pd
-from bs4 import BeautifulSoup
+import sys
+import glob
+import time
+import argparse
+import threading
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
 import requests
 import re
-import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from catalog_store import DEFAULT_CSV_PATH, DEFAULT_DB_PATH, open_catalog
+from dedupe import resolve_duplicates
+
+BASE_URL = "https://www.anime-planet.com"
+
+# Only the listing cards are built into a tree; the rest of the page is skipped.
+# (The strainer sees the raw class attribute, so match it as a word list.)
+CARDS = SoupStrainer('li', class_=lambda css: css is not None and 'card' in css.split())
+
+# Elements that never get an end tag, so the tooltip parser doesn't track them
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
 
 def clean_filename(filename):
     return re.sub(r'[\\/*?:"<>|]', "", filename).replace(" ", "_")
 
-def process_anime_html(html_path, csv_path, posters_dir):
-    if not os.path.exists(posters_dir):
-        os.makedirs(posters_dir)
+class TooltipParser(HTMLParser):
+    """
+    Single-pass reader for the card tooltip (the HTML inside the link's
+    `title` attribute). Collects the entry bar items, rating, synopsis and
+    tags without building a second BeautifulSoup tree per card.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.entry_items = []   # (class, text) for each li in ul.entryBar
+        self.rating = None
+        self.plot = None
+        self.tags = []
+        self._stack = []        # (tag, class) of the open elements
+        self._text = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            return
+        css = dict(attrs).get('class') or ''
+        self._stack.append((tag, css))
+        if tag in ('li', 'p') or css == 'ttRating':
+            self._text = []
+
+    def handle_startendtag(self, tag, attrs):
+        pass    # <br/>, <img/>: no content of their own
+
+    def handle_endtag(self, tag):
+        if not any(open_tag == tag for open_tag, _ in self._stack):
+            return  # stray end tag
+        # Close any elements left open inside this one (e.g. an unclosed <p>)
+        while self._stack[-1][0] != tag:
+            self._close(*self._stack.pop())
+        self._close(*self._stack.pop())
+
+    def _close(self, open_tag, css):
+        text = ''.join(self._text).strip() if self._text is not None else ''
+        if css == 'ttRating':
+            self.rating = text
+        elif open_tag == 'p' and self.plot is None:
+            self.plot = text
+        elif open_tag == 'li':
+            if self._inside('ul', 'entryBar'):
+                self.entry_items.append((css, text))
+            elif self._inside('div', 'tags'):
+                self.tags.append(text)
+        if open_tag in ('li', 'p') or css == 'ttRating':
+            self._text = None
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def _inside(self, tag, css):
+        return any(t == tag and c == css for t, c in self._stack)
+
+def parse_tooltip(tooltip_html):
+    parser = TooltipParser()
+    parser.feed(tooltip_html or '')
+    parser.close()
+    return parser
+
+def parse_card(card, posters_dir):
+    """Returns (record, poster job) for one listing card, or None if it isn't an anime card."""
+    a_tag = card.find('a', class_='tooltip')
+    if not a_tag:
+        return None
+
+    name = card.find('h3', class_='cardName').get_text(strip=True)
+    img_tag = card.find('img')
+    img_url = (img_tag.get('data-src') or img_tag.get('src')) if img_tag else None
+
+    tooltip = parse_tooltip(a_tag.get('title'))
+    entry_bar = dict(tooltip.entry_items)
+    # Take the start year
+    year = re.search(r'\d{4}', entry_bar.get('iconYear', ''))
+    year = year.group(0) if year else None
+    # Actors (not easily available on this page, but we can put Source/Studio)
+    actors = tooltip.entry_items[1][1] if len(tooltip.entry_items) > 1 else "Unknown Studio"
+
+    record = {
+        'Name': name,
+        'Year': year,
+        'Rating': tooltip.rating,
+        'Genres': ", ".join(tooltip.tags),
+        'Actors': actors,
+        'Plot': tooltip.plot or "No description available.",
+        'Category': 'Anime',
+        'Source_URL': BASE_URL + a_tag.get('href'),
+    }
+
+    # Posters already on disk are linked right away; the rest are handed to the
+    # download stage, which sets Poster_Path once the file is written.
+    poster_filename = f"{clean_filename(name)}_{year or 'Unknown'}.jpg"
+    if os.path.exists(os.path.join(posters_dir, poster_filename)):
+        record['Poster_Path'] = f"posters/{poster_filename}"
+        return record, None
+    if not img_url:
+        record['Poster_Path'] = None
+        return record, None
+    return record, (img_url, poster_filename)
 
+def parse_listing(html_path, posters_dir="posters", limit=None):
+    """
+    Parses one saved Anime-Planet listing page into (records, poster jobs).
+    Pure CPU work with no network access, so it runs in worker processes.
+    """
     with open(html_path, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f, 'html.parser')
-
-    cards = soup.find_all('li', class_='card')[:30]
-    
-    new_data = []
-    
-    for card in cards:
-        a_tag = card.find('a', class_='tooltip')
-        if not a_tag:
+        soup = BeautifulSoup(f, 'html.parser', parse_only=CARDS)
+
+    records, jobs = [], []
+    for card in soup.find_all('li', class_='card')[:limit]:
+        parsed = parse_card(card, posters_dir)
+        if parsed is None:
             continue
-            
-        name = card.find('h3', class_='cardName').get_text(strip=True)
-        img_tag = card.find('img')
-        img_url = img_tag.get('data-src') or img_tag.get('src')
-        
-        # Parse the tooltip title attribute
-        tooltip_html = a_tag.get('title')
-        tooltip_soup = BeautifulSoup(tooltip_html, 'html.parser')
-        
-        # Extract metadata from tooltip
-        entry_bar = tooltip_soup.find('ul', class_='entryBar')
-        year_li = entry_bar.find('li', class_='iconYear') if entry_bar else None
-        year_text = year_li.get_text(strip=True) if year_li else "Unknown"
-        # Take the start year
-        year = re.search(r'\d{4}', year_text)
-        year = year.group(0) if year else "Unknown"
-        
-        rating_div = tooltip_soup.find('div', class_='ttRating')
-        rating = rating_div.get_text(strip=True) if rating_div else "None"
-        
-        plot_p = tooltip_soup.find('p')
-        plot = plot_p.get_text(strip=True) if plot_p else "No description available."
-        
-        tags_ul = tooltip_soup.find('div', class_='tags')
-        genres = []
-        if tags_ul:
-            genres = [li.get_text(strip=True) for li in tags_ul.find_all('li')]
-        genres_str = ", ".join(genres)
-        
-        # Actors (not easily available on this page, but we can put Source/Studio)
-        studio_li = entry_bar.find_all('li')[1] if entry_bar and len(entry_bar.find_all('li')) > 1 else None
-        actors = studio_li.get_text(strip=True) if studio_li else "Unknown Studio"
-        
-        # Handle poster
-        poster_filename = f"{clean_filename(name)}_{year}.jpg"
-        poster_path = f"posters/{poster_filename}"
-        
-        if img_url:
-            try:
-                img_response = requests.get(img_url, timeout=10)
-                if img_response.status_code == 200:
-                    with open(os.path.join(posters_dir, poster_filename), 'wb') as f_img:
-                        f_img.write(img_response.content)
-                else:
-                    poster_path = "None"
-            except Exception as e:
-                print(f"Failed to download image for {name}: {e}")
-                poster_path = "None"
-        
-        source_url = "https://www.anime-planet.com" + a_tag.get('href')
-        
-        new_data.append({
-            'Name': name,
-            'Year': year,
-            'Rating': rating,
-            'Genres': genres_str,
-            'Actors': actors,
-            'Plot': plot,
-            'Poster_Path': poster_path,
-            'Category': 'Anime',
-            'Source_URL': source_url
-        })
-        print(f"Processed: {name}")
-
-    if new_data:
-        df_new = pd.DataFrame(new_data)
-        if os.path.exists(csv_path):
-            df_old = pd.read_csv(csv_path)
-            df_final = pd.concat([df_old, df_new], ignore_index=True)
-            # Remove duplicates based on Name and Year
-            df_final = df_final.drop_duplicates(subset=['Name', 'Year'], keep='last')
-            df_final.to_csv(csv_path, index=False)
+        record, job = parsed
+        records.append(record)
+        if job:
+            jobs.append((record, job))
+    return records, jobs
+
+class PosterDownloader:
+    """
+    Poster download stage: fetches images on a thread pool (one HTTP session
+    per thread), concurrently with parsing and catalog writes.
+    """
+    def __init__(self, posters_dir, workers=8):
+        self.posters_dir = posters_dir
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='poster')
+        self.local = threading.local()
+        self.pending = {}
+        self.seen = set()
+        self.downloaded = self.failed = 0
+
+    def submit(self, record, img_url, filename):
+        # The same title can be listed on several pages; fetch its poster once
+        if filename in self.seen:
+            return
+        self.seen.add(filename)
+        self.pending[self.executor.submit(self._download, img_url, filename)] = record
+
+    def _download(self, img_url, filename):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        try:
+            response = session.get(img_url, timeout=10)
+            if response.status_code != 200:
+                return None
+            tmp_path = os.path.join(self.posters_dir, filename + '.part')
+            with open(tmp_path, 'wb') as f_img:
+                f_img.write(response.content)
+            os.replace(tmp_path, os.path.join(self.posters_dir, filename))
+            return f"posters/{filename}"
+        except Exception as e:
+            print(f"Failed to download image for {filename}: {e}")
+            return None
+
+    def completed(self, wait=False):
+        """Pops finished downloads as catalog updates (Poster_Path keyed by Source_URL)."""
+        done = [future for future in self.pending if wait or future.done()]
+        updates = []
+        for future in done:
+            record = self.pending.pop(future)
+            poster_path = future.result()
+            if poster_path:
+                self.downloaded += 1
+            else:
+                self.failed += 1
+            updates.append({
+                'Name': record['Name'], 'Year': record['Year'],
+                'Source_URL': record['Source_URL'], 'Poster_Path': poster_path,
+            })
+        return updates
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+def expand_pages(patterns):
+    """Directories expand to the .html files inside them, globs to their matches."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(sorted(glob.glob(os.path.join(pattern, '*.htm*'))))
+        elif glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
         else:
-            df_new.to_csv(csv_path, index=False)
-        print(f"Successfully added {len(new_data)} anime to {csv_path}")
+            paths.append(pattern)
+    return paths
+
+def process_anime_pages(html_paths, db_path=DEFAULT_DB_PATH, posters_dir="posters", workers=None,
+                        download_workers=8, download_posters=True, batch_size=500, limit=None,
+                        csv_path=DEFAULT_CSV_PATH):
+    """
+    Batch pipeline for saved listing pages:
+    1. pages are parsed across a process pool (results stream back in order),
+    2. records are upserted into the catalog in batches as they arrive,
+    3. posters are downloaded concurrently on a thread pool, and their paths
+       written to the catalog as downloads finish,
+    4. duplicates are resolved once everything is in.
+    A new database is seeded from `csv_path` first (None to start it empty).
+    Returns the number of titles added to the catalog.
+    """
+    if not os.path.exists(posters_dir):
+        os.makedirs(posters_dir)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    pages = parsed = written = 0
+    buffer = []
+    downloader = PosterDownloader(posters_dir, download_workers) if download_posters else None
+
+    with open_catalog(db_path, csv_path) as store:
+        existing = store.count()
+        def flush():
+            nonlocal buffer, written
+            if buffer:
+                written += store.upsert_many(buffer, batch_size=batch_size)[0]
+                buffer = []
+            if downloader:
+                store.upsert_many(downloader.completed(), batch_size=batch_size)
+
+        if workers > 1 and len(html_paths) > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            results = executor.map(parse_listing, html_paths, [posters_dir] * len(html_paths),
+                                   [limit] * len(html_paths), chunksize=4)
+        else:
+            executor = None
+            results = (parse_listing(path, posters_dir, limit) for path in html_paths)
+
+        try:
+            for records, jobs in results:
+                pages += 1
+                parsed += len(records)
+                buffer.extend(records)
+                for record, (img_url, filename) in jobs:
+                    if downloader:
+                        downloader.submit(record, img_url, filename)
+                    else:
+                        record['Poster_Path'] = None
+                if len(buffer) >= batch_size:
+                    flush()
+                    print(f"Processed {pages}/{len(html_paths)} pages, {parsed} titles")
+        finally:
+            if executor:
+                executor.shutdown()
+
+        flush()
+        if downloader:
+            store.upsert_many(downloader.completed(wait=True), batch_size=batch_size)
+            downloader.shutdown()
+        # Every upsert counts as written; only the growth of the catalog is new titles
+        added = store.count() - existing
+        resolve_duplicates(store)
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {parsed} anime from {pages} pages into {db_path}: {added} added, "
+          f"{written - added} updated, in {elapsed:.1f}s ({pages / elapsed if elapsed else 0:.1f} pages/s)")
+    if downloader:
+        print(f"Posters: {downloader.downloaded} downloaded, {downloader.failed} failed")
+    return added
+
+def process_anime_html(html_path, db_path, posters_dir):
+    """Processes a single saved listing page (its first 30 cards)."""
+    return process_anime_pages([html_path], db_path, posters_dir, workers=1, limit=30)
 
 if __name__ == "__main__":
-    process_anime_html("anime_page.html", "movies_data.csv", "posters")
+    parser = argparse.ArgumentParser(description="Import saved Anime-Planet listing pages into the catalog.")
+    parser.add_argument("pages", nargs="*", default=["anime_page.html"],
+                        help="HTML files, directories of them, or glob patterns")
+    parser.add_argument("--db", default=None,
+                        help=f"Catalog database (default: {DEFAULT_DB_PATH}, seeded from {DEFAULT_CSV_PATH} if new)")
+    parser.add_argument("--posters", default="posters")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--download-workers", type=int, default=8, help="Concurrent poster downloads")
+    parser.add_argument("--no-posters", action="store_true", help="Skip downloading posters")
+    args = parser.parse_args()
+    # An explicitly chosen database starts empty instead of importing the local CSV
+    process_anime_pages(expand_pages(args.pages), args.db or DEFAULT_DB_PATH, args.posters, args.workers,
+                        args.download_workers, not args.no_posters,
+                        csv_path=None if args.db else DEFAULT_CSV_PATH)
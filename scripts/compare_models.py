@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recommender import MovieRecommender
+from facets import split_genres
+
+def model_bytes(recommender):
+    if recommender.embeddings is not None:
+        return recommender.embeddings.nbytes
+    return recommender.similarity_matrix.nbytes
+
+def evaluate(recommender, k):
+    """Top-k recommendations for every title, plus the mean latency per query."""
+    names = [r['Name'] for r in recommender.records]
+    start = time.perf_counter()
+    results = [recommender.recommend_indices(name, k) for name in names]
+    latency = (time.perf_counter() - start) / max(len(names), 1)
+    return results, latency
+
+def genre_precision(recommender, results):
+    """Share of recommended titles that have at least one genre in common with the query title."""
+    genres = [set(split_genres(r['Genres'])) for r in recommender.records]
+    hits = total = 0
+    for i, recs in enumerate(results):
+        for j in recs:
+            hits += bool(genres[i] & genres[j])
+            total += 1
+    return hits / total if total else 0.0
+
+def category_precision(recommender, results):
+    """Share of recommended titles in the same category as the query title."""
+    categories = [r['Category'] for r in recommender.records]
+    pairs = [(i, j) for i, recs in enumerate(results) for j in recs]
+    return np.mean([categories[i] == categories[j] for i, j in pairs]) if pairs else 0.0
+
+def overlap(results, baseline):
+    """Mean fraction of the baseline's top-k that also appears in the candidate's top-k."""
+    scores = [len(set(a) & set(b)) / len(b) for a, b in zip(results, baseline) if b]
+    return float(np.mean(scores)) if scores else 0.0
+
+def compare_models(csv_path='movies_data.csv', k=10, dims=(64, 128, 256)):
+    configs = [('bow', {})]
+    for dim in dims:
+        configs.append((f'lsa-{dim}-float32', {'mode': 'lsa', 'lsa_dim': dim, 'lsa_dtype': 'float32'}))
+        configs.append((f'lsa-{dim}-int8', {'mode': 'lsa', 'lsa_dim': dim, 'lsa_dtype': 'int8'}))
+
+    baseline = None
+    print(f"{'model':<20} {'memory':>10} {'latency':>10} {'overlap@' + str(k):>11} {'genre@' + str(k):>9} {'category@' + str(k):>12}")
+    for label, options in configs:
+        recommender = MovieRecommender(csv_path=csv_path, cache_dir=None, db_path=None, **options)
+        if recommender.movies is None:
+            print(f"Could not load {csv_path}")
+            return
+        results, latency = evaluate(recommender, k)
+        if baseline is None:
+            baseline = results
+        print(
+            f"{label:<20} {model_bytes(recommender) / 1024:>8.1f}KB {latency * 1000:>8.3f}ms "
+            f"{overlap(results, baseline):>11.3f} {genre_precision(recommender, results):>9.3f} "
+            f"{category_precision(recommender, results):>12.3f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare bag-of-words and LSA recommendation quality, memory and latency.")
+    parser.add_argument("--csv", default="movies_data.csv")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+    compare_models(args.csv, args.k)
@@ -1,33 +1,40 @@
-import pandas as pd
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from catalog_store import open_catalog
 
 def clean_and_truncate():
-    csv_path = 'movies_data.csv'
     posters_dir = 'posters'
-    
-    if not os.path.exists(csv_path):
-        print(f"Error: {csv_path} not found.")
-        return
 
     print("Loading data...")
-    df = pd.read_csv(csv_path)
-    
-    # Filter categories
-    movies = df[df['Category'] == 'Movie'].head(100)
-    tv_shows = df[df['Category'] == 'TV Show'].head(100)
-    anime = df[df['Category'] == 'Anime']
-    
-    # Combine back
-    new_df = pd.concat([movies, tv_shows, anime])
-    
-    # Save new CSV
-    new_df.to_csv(csv_path, index=False)
-    print(f"Truncated CSV saved. Total rows: {len(new_df)}")
+    with open_catalog() as store:
+        records = list(store.records())
+        
+        # Keep the first 100 Movies and TV Shows and every Anime
+        kept, dropped = [], []
+        counts = {'Movie': 0, 'TV Show': 0}
+        for row in records:
+            category = row['Category']
+            if category in counts:
+                counts[category] += 1
+                if counts[category] > 100:
+                    dropped.append(row['ID'])
+                    continue
+            if category in counts or category == 'Anime':
+                kept.append(row)
+            else:
+                dropped.append(row['ID'])
+        
+        # Delete the rest in one transaction
+        store.delete(dropped)
+        print(f"Truncated catalog. Total rows: {len(kept)}")
     
     # Cleanup posters
     referenced_posters = set()
-    for path in new_df['Poster_Path']:
-        if isinstance(path, str) and path != 'None':
+    for row in kept:
+        path = row['Poster_Path']
+        if path:
             # Handle posters/ prefix if present
             clean_path = path.replace('posters/', '')
             referenced_posters.add(clean_path)
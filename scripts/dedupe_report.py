@@ -0,0 +1,67 @@
+import os
+import sys
+import csv
+import time
+import argparse
+from itertools import combinations
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from catalog_store import clean_value
+from dedupe import find_duplicates
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dedupe_fixtures.csv')
+
+def load_fixtures(path):
+    """Labelled records: rows sharing an `Entity` label are the same work."""
+    with open(path, newline='', encoding='utf-8') as f:
+        records = [{k: clean_value(k, v) for k, v in row.items()} for row in csv.DictReader(f)]
+    for record in records:
+        record['ID'] = int(record['ID'])
+    return records
+
+def pairs_of(groups):
+    return {pair for ids in groups for pair in combinations(sorted(ids), 2)}
+
+def dedupe_report(path=FIXTURES):
+    records = load_fixtures(path)
+    by_id = {r['ID']: r for r in records}
+
+    entities = {}
+    for r in records:
+        entities.setdefault(r['Entity'], []).append(r['ID'])
+    expected = pairs_of(entities.values())
+
+    start = time.perf_counter()
+    clusters, candidates = find_duplicates(records)
+    elapsed = time.perf_counter() - start
+    found = pairs_of(clusters)
+
+    true_positives = found & expected
+    precision = len(true_positives) / len(found) if found else 1.0
+    recall = len(true_positives) / len(expected) if expected else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    all_pairs = len(records) * (len(records) - 1) // 2
+
+    print(f"records:          {len(records)} ({len(entities)} distinct works)")
+    print(f"candidate pairs:  {candidates} of {all_pairs} ({candidates / all_pairs:.1%})")
+    print(f"duplicate pairs:  {len(found)} found, {len(expected)} labelled")
+    print(f"precision:        {precision:.3f}")
+    print(f"recall:           {recall:.3f}")
+    print(f"f1:               {f1:.3f}")
+    print(f"time:             {elapsed * 1000:.1f}ms")
+
+    def describe(pair):
+        left, right = by_id[pair[0]], by_id[pair[1]]
+        return f"{left['Name']!r} ({left['Year']}, {left['Category']}) ~ {right['Name']!r} ({right['Year']}, {right['Category']})"
+
+    for label, pairs in (("False positives", found - expected), ("Missed duplicates", expected - found)):
+        if pairs:
+            print(f"\n{label}:")
+            for pair in sorted(pairs):
+                print(f"  {describe(pair)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precision/recall of duplicate detection on a labelled fixture set.")
+    parser.add_argument("--fixtures", default=FIXTURES)
+    args = parser.parse_args()
+    dedupe_report(args.fixtures)
@@ -1,74 +1,63 @@
-import pandas as pd
 import os
-from scraper import WatchifyScraper
+import sys
 import time
 import random
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from catalog_store import open_catalog
+from scraper import WatchifyScraper
+
 def patch_missing_posters():
     scraper = WatchifyScraper()
-    csv_path = "movies_data.csv"
-    
-    if not os.path.exists(csv_path):
-        print(f"Error: {csv_path} not found.")
-        return
-
-    df = pd.read_csv(csv_path)
-    total_rows = len(df)
-    
-    # Fill NaN or 'None' values
-    df['Poster_Path'] = df['Poster_Path'].fillna('None')
+    store = open_catalog(scraper.db_path, scraper.csv_path)
+    records = list(store.records())
+    total_rows = len(records)
     
     # Identify rows needing a poster
-    # We check if path is 'None' OR if the file doesn't actually exist locally
+    # We check if path is missing OR if the file doesn't actually exist locally
     def needs_patch(row):
-        path = str(row['Poster_Path'])
-        if path == 'None':
+        path = row['Poster_Path']
+        if path is None:
             return True
         # Check if local file exists (path stored as posters/Name_Year.jpg)
         return not os.path.exists(path)
 
-    mask = df.apply(needs_patch, axis=1)
-    missing_df = df[mask]
+    missing = [row for row in records if needs_patch(row)]
     
-    print(f"Found {len(missing_df)} titles missing posters out of {total_rows}.")
+    print(f"Found {len(missing)} titles missing posters out of {total_rows}.")
     
-    if len(missing_df) == 0:
+    if len(missing) == 0:
         print("Everything looks good! No patching needed.")
+        store.close()
         return
 
     count = 0
-    save_interval = 10
     
-    for index, row in missing_df.iterrows():
+    for row in missing:
         url = row['Source_URL']
         name = row['Name']
         year = row['Year']
         category = row['Category']
         
-        print(f"[{count+1}/{len(missing_df)}] Patching poster for: {name} ({year})...")
+        print(f"[{count+1}/{len(missing)}] Patching poster for: {name} ({year})...")
         
         # We reuse the scraper's get_details for the specific URL
         # This will now use the FIXED logic
         details = scraper.get_details(url, category)
         
         if details and details['Poster_Path'] != 'None':
-            df.at[index, 'Poster_Path'] = details['Poster_Path']
+            # Each patch is its own small transaction, so progress is never lost
+            store.update(row['ID'], Poster_Path=details['Poster_Path'])
             print(f"    Success! Saved to: {details['Poster_Path']}")
         else:
             print(f"    Failed to find poster for {name}")
         
         count += 1
         
-        # Periodic save
-        if count % save_interval == 0:
-            df.to_csv(csv_path, index=False)
-            print(f"--- Saved progress ({count} processed) ---")
-        
         # Polite delay to avoid rate limiting
         time.sleep(random.uniform(0.5, 1.5))
 
-    # Final save
-    df.to_csv(csv_path, index=False)
+    store.close()
     print("Patching complete.")
 
 if __name__ == "__main__":